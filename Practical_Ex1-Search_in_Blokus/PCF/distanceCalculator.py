@@ -0,0 +1,190 @@
+# distanceCalculator.py
+# ---------------------
+
+"""
+Maze distances between every pair of positions of a layout, for agents
+and heuristics that ask for them over and over.
+
+A Distancer numbers the positions that aren't walls and finds the
+distances from blocks of them at once, one breadth first layer at a time,
+into an int16 NumPy matrix. The matrix is saved to the cache directory (a
+per-user one by default) under a hash of the walls, so every maze is only
+solved once. The matrix and the working arrays of the search stay within
+maxBytes; mazes whose matrix would not fit get single rows instead, each by
+its own breadth first search when first asked for, keeping as many rows as
+fit.
+"""
+
+import collections
+import hashlib
+import os
+
+import numpy as np
+
+from PCF.game import Actions, Directions
+
+USER_CACHE_DIRECTORY = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+DEFAULT_CACHE_DIRECTORY = os.path.join(USER_CACHE_DIRECTORY, 'pacman', 'distances')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+SEARCH_ARRAYS = 4 # the boolean (sources, positions + 1) arrays of _computeMatrix
+MAX_DISTANCERS = 16
+UNREACHABLE = -1
+DIRECTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+
+def wallsHash(walls):
+  "Returns a hex digest identifying the walls Grid"
+  return hashlib.sha1(('%d %d\n%s' % (walls.width, walls.height, walls)).encode()).hexdigest()
+
+class Distancer:
+  """
+  Answers maze distance queries in O(1) after a single all-pairs breadth
+  first search (or one search per row, for mazes over maxBytes).
+  """
+  def __init__(self, walls, maxBytes=DEFAULT_MAX_BYTES, cacheDirectory=DEFAULT_CACHE_DIRECTORY):
+    self.walls = walls
+    self.positions = [(x, y) for x in range(walls.width) for y in range(walls.height) if not walls[x][y]]
+    self.index = dict((position, i) for i, position in enumerate(self.positions))
+    self.neighbours = np.full((len(self.positions), len(DIRECTIONS)), -1, np.int64)
+    for i, (x, y) in enumerate(self.positions):
+      for d, direction in enumerate(DIRECTIONS):
+        dx, dy = Actions.directionToVector(direction)
+        self.neighbours[i, d] = self.index.get((int(x + dx), int(y + dy)), -1)
+
+    self.matrix = None
+    self.rows = collections.OrderedDict() # row index -> distances, oldest first
+    n = max(1, len(self.positions))
+    self.maxRows = max(1, maxBytes // (2 * n))
+    # The matrix takes 2 n * n bytes, and the search needs room for SEARCH_ARRAYS rows of n + 1 booleans per source
+    self.blockSize = min(n, (maxBytes - 2 * n * n) // (SEARCH_ARRAYS * (n + 1)))
+    if self.blockSize >= 1:
+      self.matrix = self._loadMatrix(cacheDirectory)
+
+  def getDistance(self, pos1, pos2):
+    "Returns the maze distance between two positions that aren't walls, or inf if there is no path"
+    i, j = self.index[pos1], self.index[pos2]
+    distance = self.matrix[i, j] if self.matrix is not None else self._getRow(i)[j]
+    return float('inf') if distance == UNREACHABLE else int(distance)
+
+  def getDistances(self, positions1, positions2):
+    "Returns the (len(positions1), len(positions2)) float array of their maze distances, inf where there is no path"
+    rows = [self.index[position] for position in positions1]
+    columns = [self.index[position] for position in positions2]
+    if self.matrix is not None:
+      distances = self.matrix[np.ix_(rows, columns)]
+    else:
+      distances = np.array([self._getRow(i)[columns] for i in rows]).reshape(len(rows), len(columns))
+    distances = distances.astype(float)
+    distances[distances == UNREACHABLE] = float('inf')
+    return distances
+
+  def getPath(self, pos1, pos2):
+    "Returns a shortest list of actions from pos1 to pos2, or None if there is no path"
+    distance = self.getDistance(pos1, pos2)
+    if distance == float('inf'): return None
+    target = self.index[pos2]
+    row = self._getRow(target) if self.matrix is None else self.matrix[target] # distances are symmetric
+    path = []
+    i = self.index[pos1]
+    while row[i] > 0:
+      for d, neighbour in enumerate(self.neighbours[i]):
+        if neighbour >= 0 and row[neighbour] == row[i] - 1:
+          path.append(DIRECTIONS[d])
+          i = neighbour
+          break
+    return path
+
+  def _getRow(self, i):
+    if i not in self.rows:
+      if len(self.rows) >= self.maxRows: self.rows.popitem(last=False)
+      row = np.full(len(self.positions), UNREACHABLE, np.int16)
+      row[i] = 0
+      queue = collections.deque([i])
+      while queue:
+        current = queue.popleft()
+        for neighbour in self.neighbours[current]:
+          if neighbour >= 0 and row[neighbour] == UNREACHABLE:
+            row[neighbour] = row[current] + 1
+            queue.append(neighbour)
+      self.rows[i] = row
+    return self.rows[i]
+
+  def _loadMatrix(self, cacheDirectory):
+    "Returns the all-pairs distance matrix, from the cache directory if it was saved there"
+    fname = os.path.join(cacheDirectory, 'distances_%s.npy' % wallsHash(self.walls))
+    if os.path.exists(fname):
+      return np.load(fname)
+    matrix = self._computeMatrix()
+    try:
+      os.makedirs(cacheDirectory, exist_ok=True)
+      np.save(fname, matrix)
+    except OSError:
+      pass # the cache is only an optimization
+    return matrix
+
+  def _computeMatrix(self):
+    """
+    A breadth first search from blockSize positions at a time: row i of
+    frontier is the layer around source i. Column n stands for the missing
+    neighbours and is never reached, and every array is allocated up front.
+    """
+    n = len(self.positions)
+    matrix = np.full((n, n), UNREACHABLE, np.int16)
+    neighbours = np.where(self.neighbours >= 0, self.neighbours, n)
+    frontier, nextFrontier, reached = [np.zeros((self.blockSize, n + 1), bool) for _ in range(SEARCH_ARRAYS - 1)]
+    moved = np.zeros((self.blockSize, n), bool) # contiguous, as np.take's output must be
+    for start in range(0, n, self.blockSize):
+      stop = min(n, start + self.blockSize)
+      block = slice(0, stop - start)
+      frontier.fill(False)
+      frontier[np.arange(stop - start), np.arange(start, stop)] = True
+      reached[:] = frontier
+      matrix[np.arange(start, stop), np.arange(start, stop)] = 0
+      depth = 0
+      while frontier[block].any():
+        depth += 1
+        nextFrontier.fill(False)
+        for d in range(len(DIRECTIONS)):
+          np.take(frontier, neighbours[:, d], axis=1, out=moved, mode='clip')
+          nextFrontier[:, :n] |= moved
+        nextFrontier[:, n] = False
+        np.greater(nextFrontier, reached, out=nextFrontier) # and not reached before
+        reached |= nextFrontier
+        np.copyto(matrix[start:stop], depth, where=nextFrontier[block, :n])
+        frontier, nextFrontier = nextFrontier, frontier
+    return matrix
+
+def minimumSpanningTreeWeight(distances):
+  "Returns the weight of a minimum spanning tree of the complete graph with the (n, n) distances array (Prim)"
+  n = len(distances)
+  if n <= 1: return 0
+  inTree = np.zeros(n, dtype=bool)
+  inTree[0] = True
+  closest = distances[0].copy() # the distance from each position to the tree
+  weight = 0
+  for _ in range(n - 1):
+    closest[inTree] = float('inf')
+    nearest = int(np.argmin(closest))
+    weight += closest[nearest]
+    inTree[nearest] = True
+    closest = np.minimum(closest, distances[nearest])
+  return weight
+
+_distancers = collections.OrderedDict() # walls hash -> Distancer, least recently used first
+_distancersById = collections.OrderedDict() # id(walls) -> (walls, Distancer), so the walls are only hashed once
+
+def getDistancer(walls):
+  """
+  Returns the Distancer of the walls Grid, shared by every caller with the
+  same walls. The MAX_DISTANCERS most recently used ones are kept.
+  """
+  entry = _distancersById.get(id(walls))
+  if entry is None or entry[0] is not walls:
+    key = wallsHash(walls)
+    if key not in _distancers:
+      _distancers[key] = Distancer(walls)
+      if len(_distancers) > MAX_DISTANCERS: _distancers.popitem(last=False)
+    _distancers.move_to_end(key)
+    entry = _distancersById[id(walls)] = (walls, _distancers[key])
+    if len(_distancersById) > MAX_DISTANCERS: _distancersById.popitem(last=False)
+  _distancersById.move_to_end(id(walls))
+  return entry[1]
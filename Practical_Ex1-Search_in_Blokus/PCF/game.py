@@ -269,6 +269,74 @@ def reconstituteGrid(bitRep):
   width, height = bitRep[:2]
   return Grid(width, height, bitRepresentation= bitRep[2:])
 
+class FoodSet:
+  """
+  An immutable set of positions on a width x height board, packed into the
+  bits of an integer: bit x * height + y stands for (x,y), in the order of
+  Grid.asList.  Removing a position makes a new FoodSet with one integer
+  operation, the hash is computed once, and count() is a popcount, so
+  search states can hold one instead of copying and hashing a Grid.
+  """
+  __slots__ = ('width', 'height', 'bits', '_hash')
+
+  def __init__(self, width, height, bits=0):
+    self.width = width
+    self.height = height
+    self.bits = bits
+    self._hash = hash(bits)
+
+  @staticmethod
+  def fromGrid(grid):
+    "Returns the FoodSet of the True cells of a Grid, e.g. GameState.getFood()"
+    bits = 0
+    for x, column in enumerate(grid.data):
+      for y, cell in enumerate(column):
+        if cell: bits |= 1 << (x * grid.height + y)
+    return FoodSet(grid.width, grid.height, bits)
+
+  @staticmethod
+  def fromPositions(width, height, positions):
+    bits = 0
+    for x, y in positions:
+      bits |= 1 << (x * height + y)
+    return FoodSet(width, height, bits)
+
+  def has(self, x, y):
+    return (self.bits >> (x * self.height + y)) & 1 == 1
+
+  def without(self, x, y):
+    "Returns this set without (x,y), or itself if (x,y) isn't in it"
+    bit = 1 << (x * self.height + y)
+    if not self.bits & bit: return self
+    return FoodSet(self.width, self.height, self.bits & ~bit)
+
+  def count(self):
+    return bin(self.bits).count('1')
+
+  def asList(self):
+    list = []
+    bits = self.bits
+    while bits:
+      low = bits & -bits
+      list.append(divmod(low.bit_length() - 1, self.height))
+      bits ^= low
+    return list
+
+  def asGrid(self):
+    grid = Grid(self.width, self.height)
+    for x, y in self.asList():
+      grid[x][y] = True
+    return grid
+
+  def __eq__(self, other):
+    return isinstance(other, FoodSet) and self.bits == other.bits and self.height == other.height
+
+  def __hash__(self):
+    return self._hash
+
+  def __str__(self):
+    return str(self.asGrid())
+
 ####################################
 # Parts you shouldn't have to read #
 ####################################
@@ -31,6 +31,9 @@ Good luck and happy searching!
 from PCF.game import Directions
 from PCF.game import Agent
 from PCF.game import Actions
+from PCF.game import FoodSet
+from PCF.distanceCalculator import getDistancer, minimumSpanningTreeWeight
+import collections
 import util
 import time
 import search
@@ -60,6 +63,8 @@ class SearchAgent(Agent):
   Options for fn include:
     depthFirstSearch or dfs
     breadthFirstSearch or bfs
+    bidirectional_breadth_first_search or bibfs (for problems with predecessors)
+    bidirectional_uniform_cost_search or biucs (for problems with predecessors)
     
   
   Note: You should NOT change any code in SearchAgent
@@ -77,8 +82,8 @@ class SearchAgent(Agent):
       print('[SearchAgent] using function ' + fn) 
       self.searchFunction = func
     else:
-      if heuristic in dir(searchAgents):
-        heur = getattr(searchAgents, heuristic)
+      if heuristic in globals():
+        heur = globals()[heuristic]
       elif heuristic in dir(search):
         heur = getattr(search, heuristic)
       else:
@@ -88,7 +93,9 @@ class SearchAgent(Agent):
       self.searchFunction = lambda x: func(x, heuristic=heur)
       
 
-    self.searchType = PositionSearchProblem
+    if prob not in globals():
+      raise AttributeError(prob + ' is not a search problem type in searchAgents.py.')
+    self.searchType = globals()[prob]
     print('[SearchAgent] using problem type ' + prob) 
     
   def registerInitialState(self, state):
@@ -103,9 +110,12 @@ class SearchAgent(Agent):
     starttime = time.time()
     problem = self.searchType(state) # Makes a new search problem
     self.actions  = self.searchFunction(problem) # Find a path
+    if 'flattenActions' in dir(problem): self.actions = problem.flattenActions(self.actions)
     totalCost = problem.get_cost_of_actions(self.actions)
     print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
     if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+    if 'heuristicInfo' in dir(problem) and 'spanningTrees' in problem.heuristicInfo:
+      print(problem.heuristicInfo['spanningTrees'])
     
   def getAction(self, state):
     """
@@ -214,6 +224,158 @@ class PositionSearchProblem(search.SearchProblem):
       cost += self.costFn((x,y))
     return cost
 
+  def get_goal_state(self):
+    return self.goal
+
+  def get_predecessors(self, state):
+    """
+    Returns predecessor states, the actions that lead from them to state, and
+    the cost of stepping into state, for the bidirectional searches.
+    """
+    predecessors = []
+    for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+      x,y = state
+      dx, dy = Actions.directionToVector(action)
+      prevx, prevy = int(x - dx), int(y - dy)
+      if not self.walls[prevx][prevy]:
+        predecessors.append( ( (prevx, prevy), action, self.costFn(state) ) )
+
+    # Bookkeeping for display purposes
+    self._expanded += 1
+    if state not in self._visited:
+      self._visited[state] = True
+      self._visitedlist.append(state)
+
+    return predecessors
+
+class JumpPoint(tuple):
+  "A position (x, y) that remembers the direction it was jumped to in (None for the start)"
+  def __new__(cls, position, direction):
+    point = tuple.__new__(cls, position)
+    point.direction = direction
+    return point
+
+MAX_JUMP_RUNS = 16
+_jumpRuns = collections.OrderedDict() # id(walls) -> (walls, runs), least recently used first
+
+def getJumpRuns(walls):
+  """
+  Returns, for each direction and each position that isn't a wall, where a
+  run from the position in that direction stops whatever the goal: a triple
+  (end, steps, isJump) of the first jump point and the steps to it, or of
+  the last position before a wall with isJump False.  Computed once per
+  walls Grid, starting from the far end of every run; the runs of the
+  MAX_JUMP_RUNS most recently used Grids are kept.
+  """
+  entry = _jumpRuns.get(id(walls))
+  if entry is None or entry[0] is not walls:
+    def free(x, y): return not walls[x][y]
+    runs = {}
+    for direction in [Directions.EAST, Directions.WEST, Directions.NORTH, Directions.SOUTH]:
+      horizontal = direction in [Directions.EAST, Directions.WEST]
+      dx, dy = Actions.directionToVector(direction)
+      dx, dy = int(dx), int(dy)
+      positions = [(x, y) for x in range(walls.width) for y in range(walls.height) if free(x, y)]
+      positions.sort(key=lambda position: -(position[0] * dx + position[1] * dy)) # the far end of the runs first
+      runs[direction] = {}
+      for (x, y) in positions:
+        nextX, nextY = x + dx, y + dy
+        if not free(nextX, nextY):
+          runs[direction][(x, y)] = ((x, y), 0, False)
+          continue
+        if horizontal:
+          forced = (free(nextX, y-1) and not free(x, y-1)) or (free(nextX, y+1) and not free(x, y+1))
+        else:
+          forced = (free(x-1, nextY) and not free(x-1, y)) or (free(x+1, nextY) and not free(x+1, y)) or \
+                   runs[Directions.EAST][(x, nextY)][2] or runs[Directions.WEST][(x, nextY)][2]
+        if forced:
+          runs[direction][(x, y)] = ((nextX, nextY), 1, True)
+        else:
+          end, steps, isJump = runs[direction][(nextX, nextY)]
+          runs[direction][(x, y)] = (end, steps + 1, isJump)
+    entry = _jumpRuns[id(walls)] = (walls, runs)
+    if len(_jumpRuns) > MAX_JUMP_RUNS: _jumpRuns.popitem(last=False)
+  _jumpRuns.move_to_end(id(walls))
+  return entry[1]
+
+class JumpPointSearchProblem(PositionSearchProblem):
+  """
+  A PositionSearchProblem with a cost of 1 per step, whose successors are
+  jump points: from a position, Pacman runs straight on until a path may
+  have to turn (a wall beside him ends, or, running north or south, a run
+  east or west would find a jump point) or he reaches the goal. Of the
+  shortest paths that only differ by the order of their moves, only the
+  ones turning at jump points are searched, so far fewer positions are
+  expanded in open areas, and the costs found are the same.
+
+  The runs are looked up in tables built once per maze (getJumpRuns), so a
+  jump takes O(1) whatever its length.  The states are JumpPoints, which
+  compare and hash like positions.  An action is the tuple of Directions of
+  one jump; flattenActions turns a path of jumps into the Directions Pacman
+  takes.
+  """
+
+  def __init__(self, gameState, goal=(1,1), start=None, warn=True):
+    PositionSearchProblem.__init__(self, gameState, lambda x: 1, goal, start, warn)
+    self._runs = getJumpRuns(self.walls)
+
+  def get_start_state(self):
+    return JumpPoint(self.startState, None)
+
+  def get_successors(self, state):
+    """
+    Returns the jump points reached from state, the jumps that reach them
+    and their lengths.  Having jumped east or west, Pacman runs on or turns
+    north or south; having jumped north or south, he runs on or turns east
+    or west.
+    """
+    if state.direction is None:
+      directions = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+    elif state.direction in [Directions.EAST, Directions.WEST]:
+      directions = [state.direction, Directions.NORTH, Directions.SOUTH]
+    else:
+      directions = [state.direction, Directions.EAST, Directions.WEST]
+
+    successors = []
+    for direction in directions:
+      jump = self._jump(state, direction)
+      if jump != None:
+        nextState, steps = jump
+        successors.append( ( JumpPoint(nextState, direction), (direction,) * steps, steps) )
+
+    # Bookkeeping for display purposes
+    self._expanded += 1
+    if state not in self._visited:
+      self._visited[state] = True
+      self._visitedlist.append(state)
+
+    return successors
+
+  def _jump(self, position, direction):
+    """
+    Returns the next jump point running from position in direction and the
+    number of steps to it, or None if he runs into a wall first
+    """
+    x, y = position
+    goalX, goalY = self.goal
+    end, steps, isJump = self._runs[direction][position]
+    if direction in [Directions.EAST, Directions.WEST]:
+      goalSteps = (goalX - x) * (1 if direction == Directions.EAST else -1)
+      if goalY == y and 0 < goalSteps <= steps: return self.goal, goalSteps
+    else:
+      goalSteps = (goalY - y) * (1 if direction == Directions.NORTH else -1)
+      if 0 < goalSteps <= steps:
+        # He stops in the goal's row if a run east or west from there reaches the goal
+        turn = Directions.EAST if goalX >= x else Directions.WEST
+        turnSteps = abs(goalX - x)
+        if turnSteps == 0 or turnSteps <= self._runs[turn][(x, goalY)][1]: return (x, goalY), goalSteps
+    if isJump: return end, steps
+    return None
+
+  def flattenActions(self, actions):
+    "Returns the Directions of a path of jumps"
+    return [direction for jump in actions for direction in jump]
+
 class StayEastSearchAgent(SearchAgent):
   """
   An agent for position search with a cost function that penalizes being in
@@ -222,7 +384,7 @@ class StayEastSearchAgent(SearchAgent):
   The cost function for stepping into a position (x,y) is 1/2^x.
   """
   def __init__(self):
-      self.searchFunction = search.uniformCostSearch
+      self.searchFunction = search.uniform_cost_search
       costFn = lambda pos: .5 ** pos[0] 
       self.searchType = lambda state: PositionSearchProblem(state, costFn)
       
@@ -234,7 +396,7 @@ class StayWestSearchAgent(SearchAgent):
   The cost function for stepping into a position (x,y) is 2^x.
   """
   def __init__(self):
-      self.searchFunction = search.uniformCostSearch
+      self.searchFunction = search.uniform_cost_search
       costFn = lambda pos: 2 ** pos[0] 
       self.searchType = lambda state: PositionSearchProblem(state, costFn)
 
@@ -258,7 +420,8 @@ class CornersProblem(search.SearchProblem):
   """
   This search problem finds paths through all four corners of a layout.
 
-  You must select a suitable state space and successor function
+  A search state is a tuple ( pacmanPosition, corners ) where corners is a
+  FoodSet (see game.py) of the corners not visited yet.
   """
   
   def __init__(self, startingGameState):
@@ -274,19 +437,18 @@ class CornersProblem(search.SearchProblem):
         print('Warning: no food in corner ' + str(corner))
     self._expanded = 0 # Number of search nodes expanded
     
-    "*** YOUR CODE HERE ***"
+    corners = FoodSet.fromPositions(self.walls.width, self.walls.height, self.corners)
+    self.start = (self.startingPosition, corners.without(*self.startingPosition))
     
-  def getStartState(self):
+  def get_start_state(self):
     "Returns the start state (in your state space, not the full Pacman state space)"
-    "*** YOUR CODE HERE ***"
-    util.raiseNotDefined()
+    return self.start
     
-  def isGoalState(self, state):
+  def is_goal_state(self, state):
     "Returns whether this search state is a goal state of the problem"
-    "*** YOUR CODE HERE ***"
-    util.raiseNotDefined()
+    return state[1].bits == 0
        
-  def getSuccessors(self, state):
+  def get_successors(self, state):
     """
     Returns successor states, the actions they require, and a cost of 1.
     
@@ -300,19 +462,16 @@ class CornersProblem(search.SearchProblem):
     
     successors = []
     for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
-      # Add a successor state to the successor list if the action is legal
-      # Here's a code snippet for figuring out whether a new position hits a wall:
-      #   x,y = currentPosition
-      #   dx, dy = Actions.directionToVector(action)
-      #   nextx, nexty = int(x + dx), int(y + dy)
-      #   hitsWall = self.walls[nextx][nexty]
-      
-      "*** YOUR CODE HERE ***"
+      x,y = state[0]
+      dx, dy = Actions.directionToVector(action)
+      nextx, nexty = int(x + dx), int(y + dy)
+      if not self.walls[nextx][nexty]:
+        successors.append( ( ((nextx, nexty), state[1].without(nextx, nexty)), action, 1) )
       
     self._expanded += 1
     return successors
 
-  def getCostOfActions(self, actions):
+  def get_cost_of_actions(self, actions):
     """
     Returns the cost of a particular sequence of actions.  If those actions
     include an illegal move, return 999999.  This is implemented for you.
@@ -349,32 +508,32 @@ def cornersHeuristic(state, problem):
 class AStarCornersAgent(SearchAgent):
   "A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"
   def __init__(self):
-    self.searchFunction = lambda prob: search.aStarSearch(prob, cornersHeuristic)
+    self.searchFunction = lambda prob: search.a_star_search(prob, cornersHeuristic)
     self.searchType = CornersProblem
 
-class FoodSearchProblem:
+class FoodSearchProblem(search.SearchProblem):
   """
   A search problem associated with finding the a path that collects all of the 
   food (dots) in a Pacman game.
   
-  A search state in this problem is a tuple ( pacmanPosition, foodGrid ) where
+  A search state in this problem is a tuple ( pacmanPosition, foodSet ) where
     pacmanPosition: a tuple (x,y) of integers specifying Pacman's position
-    foodGrid:       a Grid (see game.py) of either True or False, specifying remaining food 
+    foodSet:        a FoodSet (see game.py) of the positions of the remaining food
   """
   def __init__(self, startingGameState):
-    self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
+    self.start = (startingGameState.getPacmanPosition(), FoodSet.fromGrid(startingGameState.getFood()))
     self.walls = startingGameState.getWalls()
     self.startingGameState = startingGameState
     self._expanded = 0
     self.heuristicInfo = {} # A dictionary for the heuristic to store information
       
-  def getStartState(self):
+  def get_start_state(self):
     return self.start
   
-  def isGoalState(self, state):
-    return state[1].count() == 0
+  def is_goal_state(self, state):
+    return state[1].bits == 0
 
-  def getSuccessors(self, state):
+  def get_successors(self, state):
     "Returns successor states, the actions they require, and a cost of 1."
     successors = []
     self._expanded += 1
@@ -383,15 +542,13 @@ class FoodSearchProblem:
       dx, dy = Actions.directionToVector(direction)
       nextx, nexty = int(x + dx), int(y + dy)
       if not self.walls[nextx][nexty]:
-        nextFood = state[1].copy()
-        nextFood[nextx][nexty] = False
-        successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
+        successors.append( ( ((nextx, nexty), state[1].without(nextx, nexty)), direction, 1) )
     return successors
 
-  def getCostOfActions(self, actions):
+  def get_cost_of_actions(self, actions):
     """Returns the cost of a particular sequence of actions.  If those actions
     include an illegal move, return 999999"""
-    x,y= self.getStartState()[0]
+    x,y= self.get_start_state()[0]
     cost = 0
     for action in actions:
       # figure out the next state and see whether it's legal
@@ -405,7 +562,7 @@ class FoodSearchProblem:
 class AStarFoodSearchAgent(SearchAgent):
   "A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"
   def __init__(self):
-    self.searchFunction = lambda prob: search.aStarSearch(prob, foodHeuristic)
+    self.searchFunction = lambda prob: search.a_star_search(prob, foodHeuristic)
     self.searchType = FoodSearchProblem
 
 def foodHeuristic(state, problem):
@@ -420,9 +577,9 @@ def foodHeuristic(state, problem):
   your heuristic is *not* consistent, and probably not admissible!  On the other hand,
   inadmissible or inconsistent heuristics may find optimal solutions, so be careful.
   
-  The state is a tuple ( pacmanPosition, foodGrid ) where foodGrid is a 
-  Grid (see game.py) of either True or False. You can call foodGrid.asList()
-  to get a list of food coordinates instead.
+  The state is a tuple ( pacmanPosition, foodSet ) where foodSet is a 
+  FoodSet (see game.py) of the remaining food. You can call foodSet.asList()
+  to get a list of food coordinates.
   
   If you want access to info like walls, capsules, etc., you can query the problem.
   For example, problem.walls gives you a Grid of where the walls are.
@@ -433,9 +590,52 @@ def foodHeuristic(state, problem):
     problem.heuristicInfo['wallCount'] = problem.walls.count()
   Subsequent calls to this heuristic can access problem.heuristicInfo['wallCount']
   """
-  position, foodGrid = state
-  "*** YOUR CODE HERE ***"
-  return 0
+  position, foodSet = state
+  if foodSet.bits == 0: return 0
+  if 'spanningTrees' not in problem.heuristicInfo:
+    problem.heuristicInfo['spanningTrees'] = SpanningTreeCache(getDistancer(problem.walls))
+  spanningTrees = problem.heuristicInfo['spanningTrees']
+  food = foodSet.asList()
+  return float(spanningTrees.distancer.getDistances([position], food).min() + spanningTrees.getWeight(foodSet, food))
+
+class SpanningTreeCache:
+  """
+  The weights of the minimum spanning trees (over maze distances) of the
+  food sets foodHeuristic sees, by food bitmask.  Most successors eat no
+  food, so the same sets come back again and again.  Only the maxEntries
+  most recently used weights are kept.
+
+  The heuristic is the distance to the closest food plus the weight of the
+  tree: collecting the food means reaching some of it, then walking a path
+  through the rest, which is a spanning tree of it.  It is consistent: a
+  move changes the first term by at most 1, and eating food f takes at most
+  the distance from f to the closest remaining food off the tree.
+  """
+  def __init__(self, distancer, maxEntries=100000):
+    self.distancer = distancer
+    self.maxEntries = maxEntries
+    self.weights = collections.OrderedDict() # food bitmask -> weight, least recently used first
+    self.hits, self.misses = 0, 0
+
+  def getWeight(self, foodSet, food):
+    "Returns the weight of the spanning tree of foodSet, whose positions are food"
+    weight = self.weights.get(foodSet.bits)
+    if weight != None:
+      self.hits += 1
+      self.weights.move_to_end(foodSet.bits)
+      return weight
+    self.misses += 1
+    weight = minimumSpanningTreeWeight(self.distancer.getDistances(food, food))
+    self.weights[foodSet.bits] = weight
+    if len(self.weights) > self.maxEntries: self.weights.popitem(last=False)
+    return weight
+
+  def hitRate(self):
+    return self.hits / max(1, self.hits + self.misses)
+
+  def __str__(self):
+    return 'Spanning tree cache: %d hits, %d misses (%.1f%% hit rate), %d entries' % \
+           (self.hits, self.misses, 100 * self.hitRate(), len(self.weights))
   
 class ClosestDotSearchAgent(SearchAgent):
   "Search for all food using a sequence of searches"
@@ -460,10 +660,10 @@ class ClosestDotSearchAgent(SearchAgent):
     startPosition = gameState.getPacmanPosition()
     food = gameState.getFood()
     walls = gameState.getWalls()
-    problem = AnyFoodSearchProblem(gameState)
+    distancer = getDistancer(walls)
 
-    "*** YOUR CODE HERE ***"
-    util.raiseNotDefined()
+    closestDot = min(food.asList(), key=lambda dot: distancer.getDistance(startPosition, dot))
+    return distancer.getPath(startPosition, closestDot)
   
 class AnyFoodSearchProblem(PositionSearchProblem):
   """
@@ -491,15 +691,14 @@ class AnyFoodSearchProblem(PositionSearchProblem):
     self.costFn = lambda x: 1
     self._visited, self._visitedlist, self._expanded = {}, [], 0
     
-  def isGoalState(self, state):
+  def is_goal_state(self, state):
     """
     The state is Pacman's position. Fill this in with a goal test
     that will complete the problem definition.
     """
     x,y = state
     
-    "*** YOUR CODE HERE ***"
-    util.raiseNotDefined()
+    return self.food[x][y]
 
 ##################
 # Mini-contest 1 #
@@ -523,9 +722,9 @@ class ApproximateSearchAgent(Agent):
     
 def mazeDistance(point1, point2, gameState):
   """
-  Returns the maze distance between any two points, using the search functions
-  you have already built.  The gameState can be any game state -- Pacman's position
-  in that state is ignored.
+  Returns the maze distance between any two points, looked up in the Distancer
+  of the layout (see distanceCalculator.py), which is built once per maze.  The
+  gameState can be any game state -- Pacman's position in that state is ignored.
   
   Example usage: mazeDistance( (2,4), (5,6), gameState)
   
@@ -536,5 +735,4 @@ def mazeDistance(point1, point2, gameState):
   walls = gameState.getWalls()
   assert not walls[x1][y1], 'point1 is a wall: ' + point1
   assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-  prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False)
-  return len(search.bfs(prob))
\ No newline at end of file
+  return getDistancer(walls).getDistance(point1, point2)
@@ -0,0 +1,202 @@
+"""
+Runs a batch of Blokus puzzles headless, in parallel, and tabulates the
+expanded nodes, solution cost, wall time and peak memory of each.
+
+USAGE:      python batch.py <jobs file> [-o <results file>] [-j <processes>] [-t <seconds>]
+EXAMPLE:    python batch.py layouts/batch_example.json -o results.csv -j 4 -t 60
+
+The jobs file is a JSON list of jobs. Each job is an object with the keys:
+- puzzle: fill, corners, cover, sub-optimal or mini-contest (required)
+- name: a label for the results table (default: the job's position)
+- size: the board size, as given to game.py -s (default [20, 20])
+- pieces: the pieces file (default valid_pieces.txt)
+- start: the starting point (default [0, 0])
+- targets: the points to cover, for cover puzzles (default [])
+- search: dfs, bfs, ucs, astar, idastar or smastar (default astar); ignored
+  for sub-optimal and mini-contest puzzles, whose cost is the number of
+  tiles they placed
+- heuristic: the heuristic function for astar, idastar and smastar
+  (default null_heuristic)
+- max_nodes: the most nodes smastar may hold, ancestors included (default 100000)
+- backend: array or bitboard (default array)
+
+The results are written as CSV, or as JSON if the results file name ends
+with .json. Every job runs in a process of its own, killed once it runs
+longer than the timeout. The status of a job is ok, unsolved (the search
+found no solution), timeout or error.
+"""
+
+import csv
+import json
+import multiprocessing
+import multiprocessing.connection
+import sys
+import time
+from optparse import OptionParser
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+RESULT_FIELDS = ['name', 'puzzle', 'search', 'heuristic', 'status', 'expanded', 'cost', 'actions',
+                 'wall_time', 'peak_memory_kb', 'error']
+
+
+def _peak_memory_kb():
+    """
+    Returns the peak resident memory of this process in KB, or None if it
+    can't be measured here
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # bytes on macOS
+
+
+def _result_row(index, job, status, error=''):
+    return {'name': job.get('name', str(index)), 'puzzle': job.get('puzzle'),
+            'search': job.get('search', 'astar'), 'heuristic': job.get('heuristic', 'null_heuristic'),
+            'status': status, 'expanded': None, 'cost': None, 'actions': None, 'wall_time': None,
+            'peak_memory_kb': None, 'error': error}
+
+
+def run_job(index, job):
+    """
+    Solves <job> in this process and returns its result row
+    """
+    import search
+    from board import set_board_backend
+    from game import create_problem, load_heuristic
+    from pieces import PieceList
+
+    set_board_backend(job.get('backend', 'array'))
+    piece_list = PieceList(job.get('pieces', 'valid_pieces.txt'))
+    problem = create_problem(job['puzzle'], job.get('size', (20, 20)), piece_list, tuple(job.get('start', (0, 0))),
+                             [tuple(target) for target in job.get('targets', [])])
+
+    start_time = time.perf_counter()
+    if job['puzzle'] in ('sub-optimal', 'mini-contest'):
+        back_trace = problem.solve()
+    else:
+        search_name = job.get('search', 'astar')
+        if search_name in ('dfs', 'bfs', 'ucs'):
+            back_trace = getattr(search, search_name)(problem)
+        elif search_name in ('astar', 'idastar', 'smastar'):
+            heuristic_name = job.get('heuristic', 'null_heuristic')
+            heuristic = search.null_heuristic if heuristic_name == 'null_heuristic' else load_heuristic(heuristic_name)
+            if search_name == 'smastar':
+                back_trace = search.smastar(problem, heuristic, job.get('max_nodes', 100000))
+            else:
+                back_trace = getattr(search, search_name)(problem, heuristic)
+        else:
+            raise Exception('unrecognized search function %s' % search_name)
+    wall_time = time.perf_counter() - start_time
+
+    board = problem.get_start_state()
+    for action in back_trace:
+        board = board.do_move(0, action)
+    if hasattr(problem, 'get_cost_of_actions'):
+        cost = problem.get_cost_of_actions(back_trace)
+    else:
+        cost = board.score(0)
+    solved = not hasattr(problem, 'is_goal_state') or problem.is_goal_state(board)
+
+    row = _result_row(index, job, 'ok' if solved else 'unsolved')
+    row['expanded'] = problem.expanded
+    row['cost'] = cost
+    row['actions'] = len(back_trace)
+    row['wall_time'] = round(wall_time, 4)
+    row['peak_memory_kb'] = _peak_memory_kb()
+    return row
+
+
+def _job_process(index, job, connection):
+    try:
+        row = run_job(index, job)
+    except Exception as e:
+        row = _result_row(index, job, 'error', repr(e))
+    connection.send(row)
+    connection.close()
+
+
+def run_jobs(jobs, processes=1, timeout=None):
+    """
+    Runs <jobs> with up to <processes> of them at a time, and returns their
+    result rows in the order of <jobs>. Jobs still running after <timeout>
+    seconds are killed and reported with the status 'timeout'.
+    """
+    results = [None] * len(jobs)
+    pending = list(enumerate(jobs))
+    running = {}  # job index -> (process, connection, start time)
+
+    while pending or running:
+        while pending and len(running) < processes:
+            index, job = pending.pop(0)
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_job_process, args=(index, job, sender), daemon=True)
+            process.start()
+            sender.close()
+            running[index] = (process, receiver, time.perf_counter())
+
+        ready = multiprocessing.connection.wait([receiver for (_, receiver, _) in running.values()], timeout=0.1)
+        for index, (process, receiver, start_time) in list(running.items()):
+            if receiver in ready:
+                try:
+                    results[index] = receiver.recv()
+                except EOFError:
+                    results[index] = _result_row(index, jobs[index], 'error',
+                                                 'worker exited with code %s' % process.exitcode)
+            elif timeout is not None and time.perf_counter() - start_time > timeout:
+                process.terminate()
+                results[index] = _result_row(index, jobs[index], 'timeout')
+                results[index]['wall_time'] = timeout
+            else:
+                continue
+            process.join()
+            receiver.close()
+            del running[index]
+
+    return results
+
+
+def write_results(results, fname):
+    """
+    Writes the result rows to <fname>, as JSON if it ends with .json and as
+    CSV otherwise
+    """
+    with open(fname, 'w', newline='') as f:
+        if fname.endswith('.json'):
+            json.dump(results, f, indent=2)
+        else:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+
+
+def main():
+    parser = OptionParser(__doc__.split('\n\n')[1])
+    parser.add_option('-o', '--output', dest='output', metavar='FILE',
+                      help='the CSV or JSON file to write the results to', default=None)
+    parser.add_option('-j', '--processes', dest='processes', type='int',
+                      help='the number of jobs to run at a time', default=multiprocessing.cpu_count())
+    parser.add_option('-t', '--timeout', dest='timeout', type='float',
+                      help='the seconds after which a job is killed', default=None)
+
+    options, args = parser.parse_args()
+    if len(args) != 1:
+        parser.error('expected exactly one jobs file')
+    with open(args[0]) as f:
+        jobs = json.load(f)
+
+    results = run_jobs(jobs, options.processes, options.timeout)
+    for row in results:
+        print("%-20s %-8s expanded: %s, cost: %s, time: %s, peak memory: %s KB %s" %
+              (row['name'], row['status'], row['expanded'], row['cost'], row['wall_time'], row['peak_memory_kb'],
+               row['error']))
+    if options.output is not None:
+        write_results(results, options.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,433 @@
+"""
+Micro-benchmarks for the Blokus board, the eight puzzle, Pacman path-finding
+and the search code.
+
+USAGE:      python benchmarks.py <benchmark> [<benchmark> ...]
+EXAMPLE:    python benchmarks.py hashing
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+import pieces
+import search
+from board import Board, Move, anchor_valid_placements
+from eightpuzzle import EightPuzzleSearchProblem, EightPuzzleState
+from pieces import PieceList
+
+
+def collect_boards(board_w, board_h, piece_list, num_boards):
+    """
+    Returns the first <num_boards> boards generated by a breadth first
+    expansion from an empty board, duplicates (transpositions) included,
+    like the boards a search pushes into its fringe.
+    """
+    boards = []
+    layer = [Board(board_w, board_h, 1, piece_list)]
+    while layer and len(boards) < num_boards:
+        next_layer = []
+        for board in layer:
+            if len(boards) + len(next_layer) >= num_boards:
+                break
+            for move in board.get_legal_moves(0):
+                next_layer.append(board.do_move(0, move))
+        boards += next_layer
+        layer = next_layer
+    return boards[:num_boards]
+
+
+def _brute_force_placements(board, player):
+    """
+    The (piece index, orientation row, x, y) of the legal moves, found as
+    get_legal_moves did before the sweep: check_move_valid on every
+    orientation of every piece at every position
+    """
+    piece_list = board.piece_list
+    placements = set()
+    for piece_index, piece in enumerate(piece_list):
+        for x in range(board.board_w):
+            for y in range(board.board_h):
+                for ori in piece:
+                    if board.check_move_valid(player, Move(piece, piece_index, ori, x, y)):
+                        placements.add((piece_index, piece_list.get_orientation_row(piece_index, ori), x, y))
+    return placements
+
+
+def _sweep_placements(board, player):
+    rows, valid = board.get_all_valid_positions(player)
+    (indices, ys, xs) = np.nonzero(valid)
+    return _as_placements(board, rows[indices], ys, xs)
+
+
+def _anchor_placements(board, player):
+    rows = np.flatnonzero(board.pieces[player][board.piece_list.orientation_pieces])
+    return _as_placements(board, *anchor_valid_placements(board, player, rows))
+
+
+def _as_placements(board, rows, ys, xs):
+    piece_indices = board.piece_list.orientation_pieces[rows]
+    return set(zip(piece_indices.tolist(), rows.tolist(), xs.tolist(), ys.tolist()))
+
+
+def benchmark_legal_moves():
+    """
+    Boards per second whose legal moves are found with the per-position
+    check_move_valid loop, with the sliding-window sweep and with the
+    windows on the anchor cells only, on the boards of a search. All three
+    must find the same moves.
+    """
+    for (board_w, board_h, num_boards) in ((14, 14, 100), (20, 20, 100)):
+        boards = collect_boards(board_w, board_h, PieceList('valid_pieces.txt'), num_boards)
+        times = []
+        placements = []
+        for find_placements in (_brute_force_placements, _sweep_placements, _anchor_placements):
+            start = time.perf_counter()
+            placements.append([find_placements(board, 0) for board in boards])
+            times.append(time.perf_counter() - start)
+
+        assert placements[0] == placements[1] == placements[2]
+        print("valid_pieces.txt %dx%d, %d boards: check_move_valid loop %.0f/s, sweep %.0f/s (x%.1f), "
+              "anchor windows %.0f/s (x%.1f)" %
+              (board_w, board_h, len(boards), len(boards) / times[0], len(boards) / times[1], times[0] / times[1],
+               len(boards) / times[2], times[0] / times[2]))
+
+
+class _StrHashedBoard:
+    """
+    The visited-set behaviour Board had before Zobrist hashing
+    """
+
+    def __init__(self, board):
+        self.board = board
+
+    def __eq__(self, other):
+        return np.array_equal(self.board.state, other.board.state) and \
+               np.array_equal(self.board.pieces, other.board.pieces)
+
+    def __hash__(self):
+        return hash(str(self.board.state))
+
+
+def _visited_set_time(states):
+    start = time.perf_counter()
+    visited = set()
+    for state in states:
+        if state not in visited:
+            visited.add(state)
+    return time.perf_counter() - start, len(visited)
+
+
+def benchmark_hashing():
+    """
+    Visited-set lookups per second with str(state) hashing and with the
+    incremental Zobrist hash.
+    """
+    for (pieces_file, board_w, board_h, num_boards) in (('tiny_set.txt', 7, 4, 2000),
+                                                        ('valid_pieces.txt', 14, 14, 20000)):
+        boards = collect_boards(board_w, board_h, PieceList(pieces_file), num_boards)
+        old_time, old_unique = _visited_set_time([_StrHashedBoard(board) for board in boards])
+        new_time, new_unique = _visited_set_time(boards)
+        assert old_unique == new_unique
+        print("%s %dx%d, %d boards (%d unique): str hash %.0f/s, Zobrist %.0f/s (x%.1f)" %
+              (pieces_file, board_w, board_h, len(boards), new_unique, len(boards) / old_time,
+               len(boards) / new_time, old_time / new_time))
+
+
+def benchmark_piece_loading():
+    """
+    PieceList loads per second with the piece file parsed every time and with
+    the parsed file cached.
+    """
+    for pieces_file in ('tiny_set.txt', 'valid_pieces.txt'):
+        num_loads = 200
+        start = time.perf_counter()
+        for _ in range(num_loads):
+            pieces._piece_file_cache.clear()
+            PieceList(pieces_file)
+        old_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(num_loads):
+            PieceList(pieces_file)
+        new_time = time.perf_counter() - start
+        print("%s: parsed %.0f/s, cached %.0f/s (x%.1f)" %
+              (pieces_file, num_loads / old_time, num_loads / new_time, old_time / new_time))
+
+
+def benchmark_distance_field():
+    """
+    Children per second with their frontier distances built from scratch and
+    with them updated from their parent's by add_move, on the boards of a
+    search.
+    """
+    for (board_w, board_h, num_boards) in ((8, 8, 100), (14, 14, 100)):
+        boards = collect_boards(board_w, board_h, PieceList('valid_pieces.txt'), num_boards)
+        moves = [board.get_legal_moves(0) for board in boards]
+        num_children = sum(len(board_moves) for board_moves in moves)
+
+        start = time.perf_counter()
+        old_distances = [board.do_move(0, move).get_frontier_distances(0)
+                         for (board, board_moves) in zip(boards, moves) for move in board_moves]
+        old_time = time.perf_counter() - start
+
+        for board in boards:
+            board.get_frontier_distances(0)
+        start = time.perf_counter()
+        new_distances = [board.do_move(0, move).get_frontier_distances(0)
+                         for (board, board_moves) in zip(boards, moves) for move in board_moves]
+        new_time = time.perf_counter() - start
+
+        for (old, new) in zip(old_distances, new_distances):
+            assert (new.to_array() <= old.to_array()).all()
+        print("valid_pieces.txt %dx%d, %d children: from scratch %.0f/s, updated %.0f/s (x%.1f)" %
+              (board_w, board_h, num_children, num_children / old_time, num_children / new_time,
+               old_time / new_time))
+
+
+class _ListEightPuzzleState:
+    """
+    The eight puzzle state before it was packed into an integer: a list of
+    lists, copied by every move and hashed as a string
+    """
+
+    def __init__(self, cells, blank_location):
+        self.cells = cells
+        self.blankLocation = blank_location
+
+    def is_goal_state(self):
+        return self.cells == [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+
+    def legalMoves(self):
+        row, col = self.blankLocation
+        return [move for (move, legal) in (('up', row != 0), ('down', row != 2), ('left', col != 0),
+                                           ('right', col != 2)) if legal]
+
+    def result(self, move):
+        row, col = self.blankLocation
+        d_row, d_col = {'up': (-1, 0), 'down': (1, 0), 'left': (0, -1), 'right': (0, 1)}[move]
+        cells = [values[:] for values in self.cells]
+        cells[row][col], cells[row + d_row][col + d_col] = cells[row + d_row][col + d_col], 0
+        return _ListEightPuzzleState(cells, (row + d_row, col + d_col))
+
+    def __eq__(self, other):
+        return self.cells == other.cells
+
+    def __hash__(self):
+        return hash(str(self.cells))
+
+
+class _ExhaustiveEightPuzzleProblem(EightPuzzleSearchProblem):
+    """
+    An eight puzzle without a goal, so a search visits every state reachable
+    from the start
+    """
+
+    def __init__(self, puzzle):
+        EightPuzzleSearchProblem.__init__(self, puzzle)
+        self.expanded = 0
+
+    def is_goal_state(self, state):
+        return False
+
+    def get_successors(self, state):
+        self.expanded += 1
+        return EightPuzzleSearchProblem.get_successors(self, state)
+
+
+def benchmark_eight_puzzle():
+    """
+    Nodes per second of a breadth first search over all the 9!/2 states
+    reachable from the eight puzzle goal, with the list of lists state and
+    with the packed state.
+    """
+    old_problem = _ExhaustiveEightPuzzleProblem(_ListEightPuzzleState([[0, 1, 2], [3, 4, 5], [6, 7, 8]], (0, 0)))
+    start = time.perf_counter()
+    search.breadth_first_search(old_problem)
+    old_time = time.perf_counter() - start
+
+    new_problem = _ExhaustiveEightPuzzleProblem(EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]))
+    start = time.perf_counter()
+    search.breadth_first_search(new_problem)
+    new_time = time.perf_counter() - start
+
+    assert old_problem.expanded == new_problem.expanded == 181440
+    print("%d states: list of lists %.0f nodes/s, packed %.0f nodes/s (x%.1f)" %
+          (new_problem.expanded, old_problem.expanded / old_time, new_problem.expanded / new_time,
+           old_time / new_time))
+
+
+def _room_layout(width, height, wall_density, seed):
+    """
+    Returns a Pacman layout of an open room with randomly placed walls
+    """
+    from PCF.layout import Layout
+
+    rng = random.Random(seed)
+    rows = ['%' * width] + \
+           ['%' + ''.join('%' if rng.random() < wall_density else ' ' for _ in range(width - 2)) + '%'
+            for _ in range(height - 2)] + ['%' * width]
+    rows[1] = '%P' + rows[1][2:]
+    return Layout(rows)
+
+
+def benchmark_jump_points():
+    """
+    Positions expanded and paths per second of A* with the Manhattan
+    heuristic between random positions, with a successor per neighbour and
+    with jump points.
+    """
+    from PCF.layout import getLayout
+    from PCF.pacman import GameState
+    from PCF.searchAgents import JumpPointSearchProblem, PositionSearchProblem, manhattanHeuristic
+
+    rng = random.Random(0)
+    for (name, layout) in (('mediumMaze', getLayout('mediumMaze')), ('room 60x30', _room_layout(60, 30, 0.2, 0)),
+                           ('room 60x30 empty', _room_layout(60, 30, 0, 0))):
+        game_state = GameState()
+        game_state.initialize(layout, 0)
+        walls = game_state.getWalls()
+        positions = [(x, y) for x in range(walls.width) for y in range(walls.height) if not walls[x][y]]
+        pairs = [rng.sample(positions, 2) for _ in range(100)]
+
+        results = []
+        for problem_type in (PositionSearchProblem, JumpPointSearchProblem):
+            expanded, costs = 0, []
+            start = time.perf_counter()
+            for (start_position, goal) in pairs:
+                problem = problem_type(game_state, goal=goal, start=start_position, warn=False)
+                actions = search.astar(problem, manhattanHeuristic)
+                if hasattr(problem, 'flattenActions'):
+                    actions = problem.flattenActions(actions)
+                expanded += problem._expanded
+                costs.append(len(actions))
+            results.append((expanded, costs, time.perf_counter() - start))
+
+        assert results[0][1] == results[1][1]
+        print("%s, %d paths: neighbours %d expanded (%.0f paths/s), jump points %d expanded (%.0f paths/s)" %
+              (name, len(pairs), results[0][0], len(pairs) / results[0][2], results[1][0],
+               len(pairs) / results[1][2]))
+
+
+SEARCH_LAYOUT = ['%%%%%%%%%%%%%%%%%%%%',
+                 '%.    ..%  %.   . .%',
+                 '%.%%%% %% %% %%% %.%',
+                 '%.  P       .      %',
+                 '%%%% %%%% %%%%%% %%%',
+                 '%.     .  %     . .%',
+                 '%%%%%%%%%%%%%%%%%%%%']
+
+
+def benchmark_food_search():
+    """
+    States expanded per second by uniform cost search for all the food of a
+    small layout, with the remaining food as a Grid copied by every move and
+    hashed cell by cell, and as a FoodSet.
+    """
+    from PCF.game import Actions, Directions
+    from PCF.layout import Layout
+    from PCF.pacman import GameState
+    from PCF.searchAgents import FoodSearchProblem
+
+    class GridFoodSearchProblem(FoodSearchProblem):
+        def __init__(self, starting_game_state):
+            FoodSearchProblem.__init__(self, starting_game_state)
+            self.start = (starting_game_state.getPacmanPosition(), starting_game_state.getFood())
+
+        def is_goal_state(self, state):
+            return state[1].count() == 0
+
+        def get_successors(self, state):
+            successors = []
+            self._expanded += 1
+            for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+                x, y = state[0]
+                dx, dy = Actions.directionToVector(direction)
+                next_x, next_y = int(x + dx), int(y + dy)
+                if not self.walls[next_x][next_y]:
+                    next_food = state[1].copy()
+                    next_food[next_x][next_y] = False
+                    successors.append((((next_x, next_y), next_food), direction, 1))
+            return successors
+
+    game_state = GameState()
+    game_state.initialize(Layout(SEARCH_LAYOUT), 0)
+    results = []
+    for problem_type in (GridFoodSearchProblem, FoodSearchProblem):
+        problem = problem_type(game_state)
+        start = time.perf_counter()
+        actions = search.ucs(problem)
+        results.append((len(actions), problem._expanded, time.perf_counter() - start))
+
+    assert results[0][:2] == results[1][:2]
+    print("%d dots, path of %d moves, %d states: Grid %.0f states/s, FoodSet %.0f states/s (x%.1f)" %
+          (game_state.getNumFood(), results[1][0], results[1][1], results[0][1] / results[0][2],
+           results[1][1] / results[1][2], results[0][2] / results[1][2]))
+
+
+def _farthest_dot_heuristic(state, problem):
+    from PCF.distanceCalculator import getDistancer
+
+    position, food_set = state
+    return 0 if food_set.bits == 0 else float(getDistancer(problem.walls).getDistances([position],
+                                                                                      food_set.asList()).max())
+
+
+def benchmark_food_heuristic():
+    """
+    States expanded by A* collecting all the food, with no heuristic, the
+    maze distance to the farthest dot and foodHeuristic (closest dot plus
+    the spanning tree of the food), and the hit rate of its cache.
+    """
+    from PCF.layout import Layout
+    from PCF.pacman import GameState
+    from PCF.searchAgents import FoodSearchProblem, foodHeuristic
+
+    room = _room_layout(30, 12, 0.15, 3)
+    rng = random.Random(3)
+    rows = [list(row) for row in room.layoutText]
+    num_dots = 0
+    while num_dots < 12:
+        x, y = rng.randrange(1, 29), rng.randrange(1, 11)
+        if rows[y][x] == ' ':
+            rows[y][x] = '.'
+            num_dots += 1
+
+    for (name, layout, heuristics) in (
+            ('search layout', Layout(SEARCH_LAYOUT), (search.null_heuristic, _farthest_dot_heuristic, foodHeuristic)),
+            ('room 30x12', Layout([''.join(row) for row in rows]), (_farthest_dot_heuristic, foodHeuristic))):
+        game_state = GameState()
+        game_state.initialize(layout, 0)
+        results = []
+        for heuristic in heuristics:
+            problem = FoodSearchProblem(game_state)
+            start = time.perf_counter()
+            actions = search.astar(problem, heuristic)
+            results.append("%s %d expanded (%d moves, %.2f s)" % (heuristic.__name__, problem._expanded, len(actions),
+                                                                   time.perf_counter() - start))
+            if 'spanningTrees' in problem.heuristicInfo:
+                results[-1] += ", %.1f%% cache hits" % (100 * problem.heuristicInfo['spanningTrees'].hitRate())
+        print("%s, %d dots: %s" % (name, game_state.getNumFood(), '; '.join(results)))
+
+
+BENCHMARKS = {
+    'hashing': benchmark_hashing,
+    'piece_loading': benchmark_piece_loading,
+    'legal_moves': benchmark_legal_moves,
+    'distance_field': benchmark_distance_field,
+    'eight_puzzle': benchmark_eight_puzzle,
+    'jump_points': benchmark_jump_points,
+    'food_search': benchmark_food_search,
+    'food_heuristic': benchmark_food_heuristic,
+}
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or sorted(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            raise Exception('Unknown benchmark %s, choose from %s' % (name, ', '.join(sorted(BENCHMARKS))))
+        print('== %s ==' % name)
+        BENCHMARKS[name]()
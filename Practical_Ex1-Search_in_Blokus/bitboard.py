@@ -0,0 +1,277 @@
+import numpy as np
+
+from board import Move, sweep_valid_positions
+from geometry import get_geometry
+from heuristic_tables import FrontierDistances, update_frontier_distances
+
+"""
+A compact Board backend storing the game state as integer bitboards.
+"""
+
+
+class BitBoard:
+
+    """
+    A drop-in replacement for Board that keeps the board in a few integers
+    instead of NumPy arrays, so copying a board is cheap.
+
+    The BitBoard stores:
+    - board_w/board_h, num_players, scores, piece_list and pieces as in Board
+    - occupied: per player, the mask of cells covered by their tiles
+    - forbidden: per player, the mask of cells they may not cover (any tile,
+      or a cell next to one of their own tiles)
+    - corners: per player, the mask of cells diagonally connected to one of
+      their tiles or to their starting corner
+    - geometry: the shared BoardGeometry with the precomputed placement masks
+    - moves: None, or once track_moves was called, per player a dict from
+      (piece_index, x, y, orientation index) to the (mask, move) of every
+      legal move, kept up to date by add_move
+    - _distances: per player, None or their FrontierDistances, as in Board
+
+    state, _legal and connected are available as (read-only) arrays with the
+    same layout as Board's.
+    """
+
+    def __init__(self, board_w, board_h, num_players, piece_list, starting_point=(0, 0)):
+        self.board_w = board_w
+        self.board_h = board_h
+        self.num_players = num_players
+        self.scores = [0] * self.num_players
+        self.piece_list = piece_list
+        self.pieces = np.full((num_players, piece_list.get_num_pieces()), True, np.bool_)
+
+        self.geometry = get_geometry(board_w, board_h, piece_list)
+        self.occupied = [0] * num_players
+        self.forbidden = [0] * num_players
+        self.corners = [0] * num_players
+        self.moves = None
+        self._distances = [None] * num_players
+        self.set_starting_point(0, starting_point)
+
+    def set_starting_point(self, player, starting_point):
+        """
+        Let <player> start from <starting_point> (given as (row, column))
+        """
+        self.corners[player] |= self.geometry.bit(starting_point[1], starting_point[0])
+        self._distances[player] = None
+        if self.moves is not None:
+            self.moves[player] = self._moves_covering(player, self._anchor_cells(player))
+
+    def track_moves(self):
+        """
+        Keep every player's legal moves from now on, so get_legal_moves does
+        not generate them again after each move. Worth it when the same board
+        gets many moves (a game), not for boards copied on every move (a search).
+        """
+        self.moves = [self._moves_covering(player, self._anchor_cells(player))
+                      for player in range(self.num_players)]
+
+    def add_move(self, player, move):
+        """
+        Try to add <player>'s <move>.
+
+        If the move is legal, the board state is updated; if it's not legal, a
+        ValueError is raised.
+
+        Returns the number of tiles placed on the board.
+        """
+        if not self.check_move_valid(player, move):
+            raise ValueError("Move is not allowed")
+
+        self.pieces[player, move.piece_index] = False  # mark piece as used
+
+        mask = self._placement(move)
+        old_corners = self.corners[player]
+        self.occupied[player] |= mask
+        self.forbidden = [forbidden | mask for forbidden in self.forbidden]
+        self.forbidden[player] |= self.geometry.sides(mask)
+        self.corners[player] |= self.geometry.diagonals(mask)
+
+        if self.moves is not None:
+            # Moves only become illegal by hitting a newly forbidden cell or
+            # using the piece just played; new ones must cover a new anchor
+            for p in range(self.num_players):
+                forbidden = self.forbidden[p]
+                self.moves[p] = {key: (move_mask, legal_move) for key, (move_mask, legal_move) in self.moves[p].items()
+                                 if not move_mask & forbidden and (p != player or key[0] != move.piece_index)}
+            new_anchors = self.corners[player] & ~old_corners & ~self.forbidden[player] & self.geometry.full
+            self.moves[player].update(self._moves_covering(player, self.geometry.cells(new_anchors)))
+        update_frontier_distances(self._distances, player, move)
+
+        num_tiles = move.piece.get_num_tiles()
+        self.scores[player] += num_tiles
+        return num_tiles
+
+    def do_move(self, player, move):
+        """
+        Performs a move, returning a new board
+        """
+        new_board = self.__copy__()
+        new_board.add_move(player, move)
+
+        return new_board
+
+    def get_legal_moves(self, player):
+        """
+        Returns a list of legal moves for given player for this board state,
+        in the same order as Board.get_legal_moves
+        """
+        moves = self.moves[player] if self.moves is not None else \
+            self._moves_covering(player, self._anchor_cells(player))
+        return [move for (_, (_, move)) in sorted(moves.items())]
+
+    def has_legal_moves(self, player):
+        """
+        Returns True if <player> has at least one legal move
+        """
+        if self.moves is not None:
+            return bool(self.moves[player])
+        return bool(self._moves_covering(player, self._anchor_cells(player)))
+
+    def get_frontier_distances(self, player):
+        """
+        Returns the FrontierDistances of <player> (see heuristic_tables), which
+        should not be modified
+        """
+        if self._distances[player] is None:
+            self._distances[player] = FrontierDistances(self.geometry, self.geometry.full & ~self.forbidden[player],
+                                                        self.occupied[player], self.corners[player])
+        return self._distances[player]
+
+    def _anchor_cells(self, player):
+        return self.geometry.cells(self.corners[player] & ~self.forbidden[player] & self.geometry.full)
+
+    def _moves_covering(self, player, cells):
+        """
+        Returns the legal moves of <player> covering one of the anchor <cells>,
+        as a dict from (piece_index, x, y, orientation index) to (mask, move)
+        """
+        forbidden = self.forbidden[player]
+        moves = {}
+        for piece_index, piece in enumerate(self.piece_list):
+            if not self.pieces[player, piece_index]:
+                continue
+
+            placements = self.geometry.placements[piece_index]
+            for (ax, ay) in cells:
+                for (ori_index, dx, dy) in piece.anchor_offsets:
+                    key = (piece_index, ax - dx, ay - dy, ori_index)
+                    if key in moves:
+                        continue
+                    ori = piece.orientation_list[ori_index]
+                    mask = placements[ori].get((ax - dx, ay - dy))
+                    if mask is not None and not mask & forbidden:
+                        moves[key] = (mask, Move(piece, piece_index, ori, ax - dx, ay - dy))
+        return moves
+
+    def get_valid_positions(self, player, piece_index, orientation):
+        """
+        See Board.get_valid_positions
+        """
+        if not self.pieces[player, piece_index]:
+            return np.zeros((self.board_h, self.board_w), np.bool_)
+        row = self.piece_list.get_orientation_row(piece_index, orientation)
+        return sweep_valid_positions(self, player, [row])[0]
+
+    def get_all_valid_positions(self, player):
+        """
+        See Board.get_all_valid_positions
+        """
+        rows = np.flatnonzero(self.pieces[player][self.piece_list.orientation_pieces])
+        return rows, sweep_valid_positions(self, player, rows)
+
+    def check_move_valid(self, player, move):
+        """
+        Check if <player> can legally perform <move>. See Board.check_move_valid
+        """
+        if not self.pieces[player, move.piece_index]:
+            # piece has already been used
+            return False
+
+        mask = self._placement(move)
+        if mask is None or mask & self.forbidden[player]:
+            return False
+        return bool(mask & self.corners[player])
+
+    def check_tile_legal(self, player, x, y):
+        """
+        Check if it's legal for <player> to place one tile at (<x>, <y>).
+        """
+        if x < 0 or x >= self.board_w or y < 0 or y >= self.board_h:
+            return False
+        return not self.forbidden[player] & self.geometry.bit(x, y)
+
+    def check_tile_attached(self, player, x, y):
+        """
+        Check if (<x>, <y>) is diagonally attached to <player>'s moves.
+        """
+        if x < 0 or x >= self.board_w or y < 0 or y >= self.board_h:
+            return False
+        return bool(self.corners[player] & self.geometry.bit(x, y))
+
+    def _placement(self, move):
+        """
+        Returns the mask covered by <move>, or None if it is out of bounds
+        """
+        return self.geometry.placements[move.piece_index][move.orientation].get((move.x, move.y))
+
+    def get_position(self, x, y):
+        bit = self.geometry.bit(x, y)
+        for player in range(self.num_players):
+            if self.occupied[player] & bit:
+                return player
+        return -1
+
+    def score(self, player):
+        return self.scores[player]
+
+    @property
+    def state(self):
+        state = np.full((self.board_h, self.board_w), -1, np.int8)
+        for player in range(self.num_players):
+            state[self.geometry.to_array(self.occupied[player])] = player
+        return state
+
+    @property
+    def _legal(self):
+        return np.array([self.geometry.to_array(self.geometry.full & ~forbidden)
+                         for forbidden in self.forbidden])
+
+    @property
+    def connected(self):
+        return np.array([self.geometry.to_array(corners) for corners in self.corners])
+
+    def __eq__(self, other):
+        return self.occupied == other.occupied and np.array_equal(self.pieces, other.pieces)
+
+    def __hash__(self):
+        return hash(tuple(self.occupied))
+
+    def __str__(self):
+        state = self.state
+        out_str = []
+        for row in range(self.board_h):
+            for col in range(self.board_w):
+                if state[col, row] == -1:
+                    out_str.append('_')
+                else:
+                    out_str.append(str(state[col, row]))
+            out_str.append('\n')
+        return ''.join(out_str)
+
+    def __copy__(self):
+        cpy_board = BitBoard.__new__(BitBoard)
+        cpy_board.board_w = self.board_w
+        cpy_board.board_h = self.board_h
+        cpy_board.num_players = self.num_players
+        cpy_board.piece_list = self.piece_list
+        cpy_board.geometry = self.geometry
+        cpy_board.occupied = self.occupied[:]
+        cpy_board.forbidden = self.forbidden[:]
+        cpy_board.corners = self.corners[:]
+        cpy_board.moves = None if self.moves is None else [dict(moves) for moves in self.moves]
+        cpy_board._distances = [None if distances is None else distances.__copy__()
+                                for distances in self._distances]
+        cpy_board.pieces = np.copy(self.pieces)
+        cpy_board.scores = self.scores[:]
+        return cpy_board
@@ -1,5 +1,6 @@
-from board import Board
-from search import SearchProblem, ucs, Node
+from board import Board, create_board
+from heuristic_tables import get_cover_bounds, get_piece_size_prefix_sums
+from search import SearchProblem, astar, Node
 import util
 
 
@@ -8,9 +9,10 @@ class BlokusFillProblem(SearchProblem):
     A one-player Blokus game as a search problem.
     This problem is implemented for you. You should NOT change it!
     """
+    lazy_successors = True
 
     def __init__(self, board_w, board_h, piece_list, starting_point=(0, 0)):
-        self.board = Board(board_w, board_h, 1, piece_list, starting_point)
+        self.board = create_board(board_w, board_h, 1, piece_list, starting_point)
         self.expanded = 0
 
     def get_start_state(self):
@@ -40,6 +42,16 @@ class BlokusFillProblem(SearchProblem):
         self.expanded = self.expanded + 1
         return [(state.do_move(0, move), move, 1) for move in state.get_legal_moves(0)]
 
+    def get_successor_actions(self, state):
+        """
+        Lazy version of get_successors: (action, stepCost) pairs only
+        """
+        self.expanded = self.expanded + 1
+        return [(move, 1) for move in state.get_legal_moves(0)]
+
+    def get_successor(self, state, action):
+        return state.do_move(0, action)
+
     def get_cost_of_actions(self, actions):
         """
         actions: A list of actions to take
@@ -54,10 +66,12 @@ class BlokusFillProblem(SearchProblem):
 # This portion is incomplete.  Time to write code!  #
 #####################################################
 class BlokusCornersProblem(SearchProblem):
+    lazy_successors = True
+
     def __init__(self, board_w, board_h, piece_list, starting_point=(0, 0)):
         self.expanded = 0
         "*** YOUR CODE HERE ***"
-        self.board = Board(board_w, board_h, 1, piece_list, starting_point)
+        self.board = create_board(board_w, board_h, 1, piece_list, starting_point)
 
     def get_start_state(self):
         """
@@ -87,6 +101,16 @@ class BlokusCornersProblem(SearchProblem):
         return [(state.do_move(0, move), move, move.piece.get_num_tiles()) for move in
                 state.get_legal_moves(0)]
 
+    def get_successor_actions(self, state):
+        """
+        Lazy version of get_successors: (action, stepCost) pairs only
+        """
+        self.expanded = self.expanded + 1
+        return [(move, move.piece.get_num_tiles()) for move in state.get_legal_moves(0)]
+
+    def get_successor(self, state, action):
+        return state.do_move(0, action)
+
     def get_cost_of_actions(self, actions):
         """
         actions: A list of actions to take
@@ -101,10 +125,37 @@ class BlokusCornersProblem(SearchProblem):
         return total_tiles_used
 
 
-def euclidian_distance(point1, point2):
-    xy1 = point1
-    xy2 = point2
-    return ((xy1[0] - xy2[0]) ** 2 + (xy1[1] - xy2[1]) ** 2) ** 0.5
+def unreachable(state: Board, cells):
+    """
+    Returns True if one of the (row, column) <cells> is neither covered by
+    player 0 nor legal for them: legal cells only ever become illegal, so
+    such a cell can never be covered.
+    """
+    for (row, col) in cells:
+        if state.get_position(col, row) != 0 and not state.check_tile_legal(0, col, row):
+            return True
+    return False
+
+
+def cover_lower_bound(state: Board, cells):
+    """
+    Returns a lower bound on the tiles player 0 must place to cover all the
+    (row, column) <cells>, inf if they never can (see
+    heuristic_tables.get_cover_bounds)
+    """
+    distances = state.get_frontier_distances(0)
+    cell_distances = [(distances.get_distance(col, row), row, col) for (row, col) in cells]
+    uncovered = tuple(sorted((cell for cell in cell_distances if cell[0] > 0), reverse=True))
+    if not uncovered:
+        return 0
+    if uncovered[0][0] == float('inf'):
+        return float('inf')
+
+    (num_tiles, num_pieces) = get_cover_bounds(uncovered)
+    prefix_sums = get_piece_size_prefix_sums(state.piece_list, state.pieces[0])
+    if num_pieces >= len(prefix_sums):
+        return float('inf')
+    return max(num_tiles, prefix_sums[num_pieces])
 
 
 def blokus_corners_heuristic(state: Board, problem):
@@ -120,30 +171,20 @@ def blokus_corners_heuristic(state: Board, problem):
     inadmissible or inconsistent heuristics may find optimal solutions, so be careful.
     """
     "*** YOUR CODE HERE ***"
-    num_unvisited_corners = state.get_position(0, state.board_w - 1) + state.get_position(
-        state.board_h - 1, 0) + state.get_position(state.board_h - 1, state.board_w - 1)
-
-    unused_pieces = []
-    for piece_id in range(state.piece_list.get_num_pieces()):
-        if state.pieces[0, piece_id] == 1:  # piece is unused
-            max_dimension = max(state.board_w, state.board_h)
-            unused_pieces.append(state.piece_list.get_piece(piece_id).get_num_tiles() + max_dimension)
-    unused_pieces.sort()
-
-    sum_tiles = 0
-    for i in range(0, len(unused_pieces) - num_unvisited_corners - 3):  # remove the biggest pieces from sum
-        sum_tiles += unused_pieces[i]
-    return sum_tiles
+    return cover_lower_bound(state, [(0, 0), (0, state.board_w - 1), (state.board_h - 1, 0),
+                                     (state.board_h - 1, state.board_w - 1)])
 
 
 class BlokusCoverProblem(SearchProblem):
+    lazy_successors = True
+
     def __init__(self, board_w, board_h, piece_list, starting_point=(0, 0), targets=[(0, 0)]):
         self.targets = targets.copy()
         self.expanded = 0
         "*** YOUR CODE HERE ***"
         self.num_of_targets = len(targets)
         self.starting_point = starting_point
-        self.board = Board(board_w, board_h, 1, piece_list, starting_point)
+        self.board = create_board(board_w, board_h, 1, piece_list, starting_point)
         self.board_size = board_h * board_w
 
     def get_start_state(self):
@@ -175,6 +216,16 @@ class BlokusCoverProblem(SearchProblem):
         return [(state.do_move(0, move), move, move.piece.get_num_tiles()) for move in
                 state.get_legal_moves(0)]
 
+    def get_successor_actions(self, state):
+        """
+        Lazy version of get_successors: (action, stepCost) pairs only
+        """
+        self.expanded = self.expanded + 1
+        return [(move, move.piece.get_num_tiles()) for move in state.get_legal_moves(0)]
+
+    def get_successor(self, state, action):
+        return state.do_move(0, action)
+
     def get_cost_of_actions(self, actions):
         """
         actions: A list of actions to take
@@ -189,48 +240,9 @@ class BlokusCoverProblem(SearchProblem):
         return total_tiles_used
 
 
-def most_far_target(state: Board, problem):
-    unvisited_targets_num = 0
-    max_distance = 0
-    for target in problem.targets:
-        if state.state[target] == -1:
-            unvisited_targets_num += 1
-            curr_distance = euclidian_distance(problem.starting_point, target)
-
-            if curr_distance > max_distance:
-                max_distance = curr_distance
-    return max_distance, unvisited_targets_num
-
-
-def find_unused_pieces(state: Board, unvisited_targets_num):
-    pieces_sizes = []
-    for piece_id in range(state.piece_list.get_num_pieces()):
-        if state.pieces[0, piece_id]:  # piece is unused
-            pieces_sizes.append(state.piece_list.get_piece(piece_id).get_num_tiles())
-            unvisited_targets_num -= 1
-            if unvisited_targets_num == 0:  # found all pieces
-                break
-    return pieces_sizes
-
-
-def sum_tiles_to_use(unvisited_targets_num, pieces_sizes, max_distance):
-    sum_tiles = 0
-    for piece_index in range(min(unvisited_targets_num, len(pieces_sizes))):
-        sum_tiles += pieces_sizes[piece_index]
-        if sum_tiles >= max_distance:
-            if unvisited_targets_num < 2:
-                return pieces_sizes[0]
-            else:
-                return sum_tiles
-    return sum_tiles
-
-
 def blokus_cover_heuristic(state: Board, problem: BlokusCoverProblem):
     "*** YOUR CODE HERE ***"
-    max_distance, unvisited_targets_num = most_far_target(state, problem)
-    pieces_sizes = find_unused_pieces(state, unvisited_targets_num)
-    pieces_sizes = sorted(pieces_sizes[:min(len(pieces_sizes), problem.num_of_targets)])
-    return sum_tiles_to_use(unvisited_targets_num, pieces_sizes, max_distance)
+    return cover_lower_bound(state, problem.targets)
 
 
 class ClosestLocationSearch:
@@ -244,7 +256,7 @@ class ClosestLocationSearch:
         self.targets = targets.copy()
         "*** YOUR CODE HERE ***"
         self.starting_point = starting_point
-        self.board = Board(board_w, board_h, 1, piece_list, starting_point)
+        self.board = create_board(board_w, board_h, 1, piece_list, starting_point)
         self.num_of_targets = len(targets)
 
     def get_start_state(self):
@@ -280,43 +292,62 @@ class ClosestLocationSearch:
         if (not self.targets) or (self.num_of_targets == 1 and self.starting_point == self.targets[0]):
             return []
 
-        # keep track of targets ordered by min distance to them
-        unvisited_targets = util.PriorityQueue()
-        for target in self.targets:
-            unvisited_targets.push(target, euclidian_distance(self.starting_point, target))
-
-        while not unvisited_targets.isEmpty():
-            closest_target = unvisited_targets.pop()  # get the closest target
-            sub_problem = SubProblem(current_state, closest_target)
-            moves_to_target = ucs(sub_problem)  # find best moves
+        # Each sub search goes to whichever uncovered target is the cheapest to
+        # reach from the current board, so the targets are taken in order of
+        # their real distance, and a single search (with a single table of best
+        # costs) replaces one search per candidate target.
+        # Targets that can't be covered any more are dropped, as searching for
+        # them would exhaust the whole state space.
+        while True:
+            uncovered_targets = [target for target in self.targets
+                                 if current_state.get_position(target[1], target[0]) != 0 and
+                                 not unreachable(current_state, [target])]
+            if not uncovered_targets:
+                return backtrace
+
+            sub_problem = SubProblem(current_state, uncovered_targets)
+            moves_to_target = astar(sub_problem, closest_target_heuristic)  # find best moves
+            self.expanded += sub_problem.expanded
+            if not moves_to_target:
+                return backtrace
 
             backtrace += moves_to_target
             for move in moves_to_target:
                 current_state = current_state.do_move(0, move)
-            self.expanded += sub_problem.expanded
-
-        return backtrace
 
 
 class SubProblem(SearchProblem):
-    def __init__(self, state: Board, target=(0, 0)):
+    """
+    Reach a board covering any one of <targets> from <state>
+    """
+    lazy_successors = True
+
+    def __init__(self, state: Board, targets=((0, 0),)):
         self.expanded = 0
         self.state = state
-        self.target = target
+        self.targets = targets
 
     def get_start_state(self):
         return self.state
 
     def is_goal_state(self, state: Board):
-        if state.get_position(self.target[1], self.target[0]) != 0:
-            return False
-        return True
+        for target in self.targets:
+            if state.get_position(target[1], target[0]) == 0:
+                return True
+        return False
 
     def get_successors(self, state):
         self.expanded += 1
         return [(state.do_move(0, move), move, move.piece.get_num_tiles()) for move in
                 state.get_legal_moves(0)]
 
+    def get_successor_actions(self, state):
+        self.expanded += 1
+        return [(move, move.piece.get_num_tiles()) for move in state.get_legal_moves(0)]
+
+    def get_successor(self, state, action):
+        return state.do_move(0, action)
+
     def get_cost_of_actions(self, actions):
         total_tiles_used = 0
         for action in actions:
@@ -324,6 +355,16 @@ class SubProblem(SearchProblem):
         return total_tiles_used
 
 
+def closest_target_heuristic(state: Board, problem: SubProblem):
+    """
+    The fewest tiles needed to reach the closest of the sub problem's targets
+    through the cells still legal for player 0 (see Board.get_frontier_distances).
+    Consistent: a move of k tiles brings every cell at most k tiles closer.
+    """
+    distances = state.get_frontier_distances(0)
+    return min(distances.get_distance(col, row) for (row, col) in problem.targets)
+
+
 class MiniContestSearch:
     """
     Implement your contest entry here
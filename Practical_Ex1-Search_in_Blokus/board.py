@@ -1,5 +1,135 @@
+import random
+
 import numpy as np
 
+from geometry import get_geometry
+from heuristic_tables import FrontierDistances, update_frontier_distances
+from pieces import MAX_TILES
+
+BOARD_BACKENDS = ('array', 'bitboard')
+SPARSE_FRONTIER = 64  # a player with at most one anchor per this many cells has their moves found from the anchors
+_board_backend = 'array'
+
+
+def set_board_backend(backend):
+    """
+    Choose the class create_board builds: 'array' for Board (NumPy arrays) or
+    'bitboard' for bitboard.BitBoard (integer bitboards, cheaper to copy)
+    """
+    global _board_backend
+    if backend not in BOARD_BACKENDS:
+        raise ValueError("Unknown board backend %s" % backend)
+    _board_backend = backend
+
+
+def create_board(board_w, board_h, num_players, piece_list, starting_point=(0, 0)):
+    """
+    Returns a new empty board using the backend chosen by set_board_backend
+    """
+    if _board_backend == 'bitboard':
+        from bitboard import BitBoard
+        return BitBoard(board_w, board_h, num_players, piece_list, starting_point)
+    return Board(board_w, board_h, num_players, piece_list, starting_point)
+
+
+_zobrist_cache = {}
+
+
+def get_zobrist_keys(board_w, board_h, num_players, num_pieces):
+    """
+    Returns the (cached) random 64-bit Zobrist keys for a board of this shape:
+    cell_keys[player][y][x] for a tile of <player> on (x, y) and
+    piece_keys[player][piece_index] for a piece <player> has used.
+    The keys are seeded, so hashes are the same from one run to the next.
+    """
+    key = (board_w, board_h, num_players, num_pieces)
+    if key not in _zobrist_cache:
+        rand = random.Random(67842)
+        cell_keys = [[[rand.getrandbits(64) for _ in range(board_w)] for _ in range(board_h)]
+                     for _ in range(num_players)]
+        piece_keys = [[rand.getrandbits(64) for _ in range(num_pieces)] for _ in range(num_players)]
+        _zobrist_cache[key] = (cell_keys, piece_keys)
+    return _zobrist_cache[key]
+
+
+_window_cache = {}
+
+
+def get_placement_windows(board_w, board_h, piece_list):
+    """
+    Returns the (cached) sliding windows of every orientation of <piece_list>
+    over a board of this size: windows[row, tile, y, x] is the index of the
+    cell covered by tile <tile> of orientation <row> (see PieceList) placed
+    with its origin on (x, y), in the flattened board padded with
+    MAX_TILES - 1 extra columns and rows.
+    """
+    key = (board_w, board_h, piece_list)
+    if key not in _window_cache:
+        padded_w = board_w + MAX_TILES - 1
+        ys, xs = np.mgrid[0:board_h, 0:board_w]
+        offsets = piece_list.orientation_offsets
+        tiles = offsets[:, :, 1] * padded_w + offsets[:, :, 0]
+        _window_cache[key] = tiles[:, :, np.newaxis, np.newaxis] + (ys * padded_w + xs)
+    return _window_cache[key]
+
+
+def sweep_valid_positions(board, player, rows):
+    """
+    Returns a (len(rows), board_h, board_w) boolean array: [i, y, x] is True
+    iff <player> can place orientation rows[i] of board.piece_list with its
+    origin on (x, y), ignoring whether the piece was already used.
+
+    Each window is checked on the legal and connected arrays padded with
+    False, so out-of-bounds placements are never valid.
+    """
+    legal, connected = _padded_cells(board, player)
+    windows = get_placement_windows(board.board_w, board.board_h, board.piece_list)[rows]
+    return legal[windows].all(axis=1) & connected[windows].any(axis=1)
+
+
+def anchor_valid_placements(board, player, rows):
+    """
+    Returns (rows, ys, xs) arrays of the placements of orientations <rows> of
+    board.piece_list that <player> can make with their origin on (x, y),
+    ignoring whether the piece was already used.
+
+    Every valid placement covers an anchor cell (see Board.get_anchors), so
+    only the windows putting some tile on one are checked, like the windows
+    of sweep_valid_positions. For a few anchors, these are a small part of
+    all the windows.
+    """
+    (anchor_xs, anchor_ys) = board.get_anchors(player)
+    if not len(anchor_xs) or not len(rows):
+        return np.zeros(0, np.intp), np.zeros(0, np.intp), np.zeros(0, np.intp)
+    offsets = board.piece_list.orientation_offsets[rows]
+    xs = (anchor_xs[:, np.newaxis, np.newaxis] - offsets[np.newaxis, :, :, 0]).ravel()
+    ys = (anchor_ys[:, np.newaxis, np.newaxis] - offsets[np.newaxis, :, :, 1]).ravel()
+    indices = np.broadcast_to(np.arange(len(rows))[np.newaxis, :, np.newaxis], (len(anchor_xs),) + offsets.shape[:2])
+    inside = (xs >= 0) & (ys >= 0)
+    candidates = np.zeros(len(rows) * board.board_h * board.board_w, np.bool_)
+    candidates[(indices.ravel()[inside] * board.board_h + ys[inside]) * board.board_w + xs[inside]] = True
+    (indices, cells) = np.divmod(np.flatnonzero(candidates), board.board_h * board.board_w)
+    (ys, xs) = np.divmod(cells, board.board_w)
+
+    legal, connected = _padded_cells(board, player)
+    rows = rows[indices]
+    windows = get_placement_windows(board.board_w, board.board_h, board.piece_list)[rows, :, ys, xs]
+    valid = legal[windows].all(axis=1) & connected[windows].any(axis=1)
+    return rows[valid], ys[valid], xs[valid]
+
+
+def _padded_cells(board, player):
+    """
+    Returns the flattened legal and connected arrays of <player>, padded with
+    MAX_TILES - 1 columns and rows of False like get_placement_windows
+    """
+    padded_shape = (board.board_h + MAX_TILES - 1, board.board_w + MAX_TILES - 1)
+    legal = np.zeros(padded_shape, np.bool_)
+    legal[:board.board_h, :board.board_w] = board._legal[player]
+    connected = np.zeros(padded_shape, np.bool_)
+    connected[:board.board_h, :board.board_w] = board.connected[player]
+    return legal.ravel(), connected.ravel()
+
 
 class Board:
 
@@ -15,6 +145,10 @@ class Board:
       on another player's piece or adjacent to a player's own piece
     - connected: a 4 x 2D array. _connected[player][y][x] is True iff (x,y) is
       diagonally connected to another one of the player's tiles
+    - _distances: per player, None or their FrontierDistances (see
+      heuristic_tables). Built by get_frontier_distances on first use and
+      then kept up to date by add_move
+    - _hash: the Zobrist hash of state and pieces, kept up to date by add_move
     - piece_list: A PieceList object (probably shared with the game engine) to
       help understand the moves
     """
@@ -33,6 +167,17 @@ class Board:
         self.connected[0, starting_point[0], starting_point[1]] = True
         self.piece_list = piece_list
         self.pieces = np.full((num_players, piece_list.get_num_pieces()), True, np.bool_)
+        self._distances = [None] * num_players
+        self._cell_keys, self._piece_keys = get_zobrist_keys(board_w, board_h, num_players,
+                                                             piece_list.get_num_pieces())
+        self._hash = 0
+
+    def set_starting_point(self, player, starting_point):
+        """
+        Let <player> start from <starting_point> (given as (row, column))
+        """
+        self.connected[player, starting_point[0], starting_point[1]] = True
+        self._distances[player] = None
 
     def add_move(self, player, move):
         """
@@ -48,11 +193,14 @@ class Board:
 
         piece = move.piece
         self.pieces[player, move.piece_index] = False  # mark piece as used
+        self._hash ^= self._piece_keys[player][move.piece_index]
+        cell_keys = self._cell_keys[player]
 
         # Update internal state for each tile
         for (xi, yi) in move.orientation:
             (x, y) = (xi + move.x, yi + move.y)
             self.state[y, x] = player
+            self._hash ^= cell_keys[y][x]
 
             # Nobody can play on this square
             for p in range(self.num_players):
@@ -78,6 +226,8 @@ class Board:
             if x < self.board_w - 1 and y > 0:
                 self.connected[player, y - 1, x + 1] = True
 
+        update_frontier_distances(self._distances, player, move)
+
         self.scores[player] += piece.get_num_tiles()
         return piece.get_num_tiles()
 
@@ -92,21 +242,87 @@ class Board:
 
     def get_legal_moves(self, player):
         """
-        Returns a list of legal moves for given player for this board state 
+        Returns a list of legal moves for given player for this board state
+
+        All the placements of the unused pieces are checked at once with
+        get_all_valid_positions, unless the player has few anchor cells (see
+        SPARSE_FRONTIER): then only the placements covering one of them are,
+        with anchor_valid_placements. The list is ordered by piece, then x, y
+        and orientation.
         """
-        # Generate all legal moves
+        piece_list = self.piece_list
+        if self._has_sparse_frontier(player):
+            rows = np.flatnonzero(self.pieces[player][piece_list.orientation_pieces])
+            rows, ys, xs = anchor_valid_placements(self, player, rows)
+        else:
+            rows, valid = self.get_all_valid_positions(player)
+            (indices, ys, xs) = np.nonzero(valid)
+            rows = rows[indices]
+        piece_indices = piece_list.orientation_pieces[rows]
+        ori_indices = rows - piece_list.piece_orientations[piece_indices]
+        order = np.lexsort((ori_indices, ys, xs, piece_indices))
+
         move_list = []
-        for piece in self.piece_list:
-            for x in range(self.board_w):
-                for y in range(self.board_h):
-                    for ori in piece:
-                        new_move = Move(piece,
-                                        self.piece_list.pieces.index(piece),
-                                        ori, x, y)
-                        if self.check_move_valid(player, new_move):
-                            move_list.append(new_move)
+        for (piece_index, ori_index, x, y) in zip(piece_indices[order].tolist(), ori_indices[order].tolist(),
+                                                  xs[order].tolist(), ys[order].tolist()):
+            piece = piece_list.pieces[piece_index]
+            move_list.append(Move(piece, piece_index, piece.orientation_list[ori_index], x, y))
         return move_list
 
+    def has_legal_moves(self, player):
+        """
+        Returns True if <player> has at least one legal move
+        """
+        if self._has_sparse_frontier(player):
+            rows = np.flatnonzero(self.pieces[player][self.piece_list.orientation_pieces])
+            return len(anchor_valid_placements(self, player, rows)[0]) > 0
+        return bool(self.get_all_valid_positions(player)[1].any())
+
+    def get_valid_positions(self, player, piece_index, orientation):
+        """
+        Returns a (board_h, board_w) boolean array, True on the (y, x) cells
+        where <player> can place <orientation> of piece <piece_index> with its
+        origin, i.e. where check_move_valid would accept the move.
+        """
+        if not self.pieces[player, piece_index]:
+            return np.zeros((self.board_h, self.board_w), np.bool_)
+        row = self.piece_list.get_orientation_row(piece_index, orientation)
+        return sweep_valid_positions(self, player, [row])[0]
+
+    def get_all_valid_positions(self, player):
+        """
+        Returns (rows, valid) for all the orientations of <player>'s unused
+        pieces: rows are their orientation rows in the piece list (see
+        PieceList), and valid[i] is the get_valid_positions array of rows[i].
+        """
+        rows = np.flatnonzero(self.pieces[player][self.piece_list.orientation_pieces])
+        return rows, sweep_valid_positions(self, player, rows)
+
+    def get_anchors(self, player):
+        """
+        Returns the (xs, ys) arrays of the cells that <player> may legally
+        cover and that are diagonally connected to their pieces (or starting
+        corner).
+        """
+        (ys, xs) = np.nonzero(self._legal[player] & self.connected[player])
+        return xs, ys
+
+    def _has_sparse_frontier(self, player):
+        num_anchors = np.count_nonzero(self._legal[player] & self.connected[player])
+        return num_anchors * SPARSE_FRONTIER <= self.board_w * self.board_h
+
+    def get_frontier_distances(self, player):
+        """
+        Returns the FrontierDistances of <player> (see heuristic_tables), which
+        should not be modified
+        """
+        if self._distances[player] is None:
+            geometry = get_geometry(self.board_w, self.board_h, self.piece_list)
+            self._distances[player] = FrontierDistances(geometry, geometry.from_array(self._legal[player]),
+                                                        geometry.from_array(self.state == player),
+                                                        geometry.from_array(self.connected[player]))
+        return self._distances[player]
+
     def check_move_valid(self, player, move):
         """
         Check if <player> can legally perform <move>.
@@ -178,10 +394,14 @@ class Board:
         return self.scores[player]
 
     def __eq__(self, other):
+        # Different hashes always mean different boards, so only compare the
+        # arrays on a hash match
+        if self._hash != other._hash:
+            return False
         return np.array_equal(self.state, other.state) and np.array_equal(self.pieces, other.pieces)
 
     def __hash__(self):
-        return hash(str(self.state))
+        return self._hash
 
     def __str__(self):
         out_str = []
@@ -201,6 +421,9 @@ class Board:
         cpy_board.connected = np.copy(self.connected)
         cpy_board.pieces = np.copy(self.pieces)
         cpy_board.scores = self.scores[:]
+        cpy_board._hash = self._hash
+        cpy_board._distances = [None if distances is None else distances.__copy__()
+                                for distances in self._distances]
         return cpy_board
 
 
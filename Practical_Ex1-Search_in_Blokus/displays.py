@@ -1,8 +1,10 @@
-import tkinter
 import sys
 
 """
 Classes to control the game's display (screen, GUI, etc)
+
+tkinter is only imported once a GuiDisplay is created, so the other displays
+work on machines without Tk or without a screen.
 """
 
 
@@ -29,10 +31,26 @@ class NoDisplay(Display):
     iterations of the game.
     """
 
-    def draw_board(self, board):
+    def draw_board(self, board, dots=()):
         pass
 
 
+class TextDisplay(Display):
+    """The TextDisplay prints the board to the terminal, with the top row
+    first like GuiDisplay: '_' is a free cell, '*' a free cell with a dot
+    and digits are the players' tiles.
+    """
+
+    def draw_board(self, board, dots=()):
+        state = board.state
+        dots = set(dots)
+        rows = []
+        for i in reversed(range(len(state))):
+            rows.append(''.join(('*' if (i, j) in dots else '_') if state[i][j] == -1 else str(state[i][j])
+                                for j in range(len(state[i]))))
+        print('\n'.join(rows) + '\n')
+
+
 BLACK = '#%02x%02x%02x' % (int(0 * 255), int(0 * 255), int(0 * 255))
 GREY = '#%02x%02x%02x' % (int(0.8 * 255), int(0.8 * 255), int(0.8 * 255))
 RED = '#%02x%02x%02x' % (int(1 * 255), int(0 * 255), int(0 * 255))
@@ -48,6 +66,8 @@ class GuiDisplay(Display):
     _colors = [RED, YELLOW, GREEN, BLUE]
 
     def __init__(self, x=20, y=20, color=GREY, title=None):
+        import tkinter
+
         self.x = x
         self.y = y
         self._left_click_loc = None
@@ -9,6 +9,7 @@
 import search
 import random
 
+MAX_SIZE = 4  # the numbers of a bigger puzzle don't fit in the 4 bits of a cell
 
 # Module Classes
 
@@ -20,6 +21,9 @@ class EightPuzzleState(search.SearchProblem):
     This class defines the mechanics of the puzzle itself.  The
     task of recasting this puzzle as a search problem is left to
     the EightPuzzleSearchProblem class.
+
+    Larger square puzzles work the same way: given 16 numbers, it is
+    the fifteen puzzle. Puzzles of more than MAX_SIZE rows can't be packed.
     """
 
     def __init__(self, numbers):
@@ -41,18 +45,29 @@ class EightPuzzleState(search.SearchProblem):
             | 6 | 7 | 8 |
             ------------
 
-        The configuration of the puzzle is stored in a 2-dimensional
-        list (a list of lists) 'cells'.
+        The configuration of the puzzle is packed into the integer
+        'packed', 4 bits per cell in row-major order, and the cell of the
+        blank is kept in 'blank'. The 2-dimensional list (a list of lists)
+        'cells' and the (row, column) 'blankLocation' are unpacked from
+        them on demand.
         """
-        self.cells = []
-        numbers = numbers[:]  # Make a copy so as not to cause side-effects.
-        numbers.reverse()
-        for row in range(3):
-            self.cells.append([])
-            for col in range(3):
-                self.cells[row].append(numbers.pop())
-                if self.cells[row][col] == 0:
-                    self.blankLocation = row, col
+        self.size = int(round(len(numbers) ** 0.5))
+        if self.size > MAX_SIZE:
+            raise ValueError("A puzzle has at most %d rows, not %d" % (MAX_SIZE, self.size))
+        self.packed = 0
+        for cell, number in enumerate(numbers):
+            self.packed |= number << 4 * cell
+        self.blank = numbers.index(0)
+        self._goal, self._targets = get_move_tables(self.size)
+
+    @property
+    def cells(self):
+        numbers = self.get_numbers()
+        return [numbers[row * self.size:(row + 1) * self.size] for row in range(self.size)]
+
+    @property
+    def blankLocation(self):
+        return divmod(self.blank, self.size)
 
     def is_goal_state(self):
         """
@@ -66,19 +81,13 @@ class EightPuzzleState(search.SearchProblem):
             | 6 | 7 | 8 |
             -------------
 
-        >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).get_start_state()
+        >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).is_goal_state()
         True
 
-        >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).get_start_state()
+        >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).is_goal_state()
         False
         """
-        current = 0
-        for row in range(3):
-            for col in range(3):
-                if current != self.cells[row][col]:
-                    return False
-                current += 1
-        return True
+        return self.packed == self._goal
 
     def legalMoves(self):
         """
@@ -90,17 +99,7 @@ class EightPuzzleState(search.SearchProblem):
         >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).legalMoves()
         ['down', 'right']
         """
-        moves = []
-        row, col = self.blankLocation
-        if (row != 0):
-            moves.append('up')
-        if (row != 2):
-            moves.append('down')
-        if (col != 0):
-            moves.append('left')
-        if (col != 2):
-            moves.append('right')
-        return moves
+        return list(self._targets[self.blank])
 
     def result(self, move):
         """
@@ -114,29 +113,18 @@ class EightPuzzleState(search.SearchProblem):
         NOTE: This function *does not* change the current object.  Instead,
         it returns a new object.
         """
-        row, col = self.blankLocation
-        if (move == 'up'):
-            newrow = row - 1
-            newcol = col
-        elif (move == 'down'):
-            newrow = row + 1
-            newcol = col
-        elif (move == 'left'):
-            newrow = row
-            newcol = col - 1
-        elif (move == 'right'):
-            newrow = row
-            newcol = col + 1
-        else:
+        target = self._targets[self.blank].get(move)
+        if target is None:
             raise Exception("Illegal Move")
+        number = (self.packed >> 4 * target) & 15
 
-        # Create a copy of the current eightPuzzle
-        newPuzzle = EightPuzzleState([0, 0, 0, 0, 0, 0, 0, 0, 0])
-        newPuzzle.cells = [values[:] for values in self.cells]
-        # And update it to reflect the move
-        newPuzzle.cells[row][col] = self.cells[newrow][newcol]
-        newPuzzle.cells[newrow][newcol] = self.cells[row][col]
-        newPuzzle.blankLocation = newrow, newcol
+        # Create a copy of the current eightPuzzle, with the number moved into the blank
+        newPuzzle = self.__class__.__new__(self.__class__)
+        newPuzzle.size = self.size
+        newPuzzle.packed = self.packed ^ (number << 4 * target) ^ (number << 4 * self.blank)
+        newPuzzle.blank = target
+        newPuzzle._goal = self._goal
+        newPuzzle._targets = self._targets
 
         return newPuzzle
 
@@ -150,27 +138,34 @@ class EightPuzzleState(search.SearchProblem):
               EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left')
           True
         """
-        for row in range(3):
-            if self.cells[row] != other.cells[row]:
-                return False
-        return True
+        return self.packed == other.packed and self.size == other.size
 
     def __hash__(self):
-        return hash(str(self.cells))
+        return hash(self.packed)
+
+    def get_numbers(self):
+        """
+          Returns the ordering of numbers this puzzle was constructed from
+
+        >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left').get_numbers()
+        [0, 1, 2, 3, 4, 5, 6, 7, 8]
+        """
+        return [(self.packed >> 4 * cell) & 15 for cell in range(self.size * self.size)]
 
     def __getAsciiString(self):
         """
           Returns a display string for the maze
         """
         lines = []
-        horizontalLine = ('-' * (13))
+        width = len(str(self.size * self.size - 1))
+        horizontalLine = ('-' * (4 * self.size + 1))
         lines.append(horizontalLine)
         for row in self.cells:
             rowLine = '|'
             for col in row:
                 if col == 0:
                     col = ' '
-                rowLine = rowLine + ' ' + col.__str__() + ' |'
+                rowLine = rowLine + ' ' + col.__str__().rjust(width) + ' |'
             lines.append(rowLine)
             lines.append(horizontalLine)
         return '\n'.join(lines)
@@ -179,6 +174,37 @@ class EightPuzzleState(search.SearchProblem):
         return self.__getAsciiString()
 
 
+OPPOSITE_MOVES = {'up': 'down', 'down': 'up', 'left': 'right', 'right': 'left'}
+
+_move_tables_cache = {}
+
+
+def get_move_tables(size):
+    """
+      Returns the move tables of the puzzles with <size> rows: the packed
+    goal, and for every cell of the blank, a dict from each of its legal
+    moves to the cell the blank moves to
+    """
+    if size not in _move_tables_cache:
+        goal = 0
+        for cell in range(size * size):
+            goal |= cell << 4 * cell
+        targets = []
+        for cell in range(size * size):
+            row, col = divmod(cell, size)
+            targets.append({})
+            if (row != 0):
+                targets[cell]['up'] = cell - size
+            if (row != size - 1):
+                targets[cell]['down'] = cell + size
+            if (col != 0):
+                targets[cell]['left'] = cell - 1
+            if (col != size - 1):
+                targets[cell]['right'] = cell + 1
+        _move_tables_cache[size] = (goal, targets)
+    return _move_tables_cache[size]
+
+
 # TODO: Implement The methods in this class
 
 class EightPuzzleSearchProblem(search.SearchProblem):
@@ -193,7 +219,7 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         self.puzzle = puzzle
 
     def get_start_state(self):
-        return puzzle
+        return self.puzzle
 
     def is_goal_state(self, state):
         return state.is_goal_state()
@@ -209,6 +235,19 @@ class EightPuzzleSearchProblem(search.SearchProblem):
             succ.append((state.result(a), a, 1))
         return succ
 
+    def get_goal_state(self):
+        return EightPuzzleState(list(range(self.puzzle.size * self.puzzle.size)))
+
+    def get_predecessors(self, state):
+        """
+          Returns list of (predecessor, action, stepCost) triples: moving
+          the blank back undoes the action that brought it here
+        """
+        pred = []
+        for a in state.legalMoves():
+            pred.append((state.result(a), OPPOSITE_MOVES[a], 1))
+        return pred
+
     def get_cost_of_actions(self, actions):
         """
          actions: A list of actions to take
@@ -248,15 +287,16 @@ def loadEightPuzzle(puzzleNumber):
     return EightPuzzleState(EIGHT_PUZZLE_DATA[puzzleNumber])
 
 
-def createRandomEightPuzzle(moves=100):
+def createRandomEightPuzzle(moves=100, size=3):
     """
       moves: number of random moves to apply
+      size: the number of rows (and columns): 4 for the fifteen puzzle
 
       Creates a random eight puzzle by applying
       a series of 'moves' random moves to a solved
       puzzle.
     """
-    puzzle = EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8])
+    puzzle = EightPuzzleState(list(range(size * size)))
     for i in range(moves):
         # Execute a random legal move
         puzzle = puzzle.result(random.sample(puzzle.legalMoves(), 1)[0])
@@ -1,8 +1,9 @@
 from inputs import RandomInput
 from pieces import PieceList
 from blokus_problems import *
-from search import astar
-from displays import GuiDisplay
+from board import BOARD_BACKENDS, create_board, set_board_backend
+from search import astar, idastar, smastar, SearchStats
+from displays import GuiDisplay, NoDisplay, TextDisplay
 import sys
 import os
 import ast
@@ -14,8 +15,8 @@ class GameEngine(object):
     get input/draw output
     """
 
-    def __init__(self, inputs, width, height, piece_list):
-        self.display = GuiDisplay(width, height, title='Intro to AI -- 67842 -- Practical - Ex1')
+    def __init__(self, inputs, width, height, piece_list, graphics='gui'):
+        self.display = create_display(width, height, graphics)
         self.inputs = inputs
 
         self.piece_list = piece_list
@@ -25,16 +26,19 @@ class GameEngine(object):
         self.board_h = height
         self.turn_num = 0
         self.passed = [False] * self.num_players
+        self.pass_turns = [None] * self.num_players
         self.score = [0] * self.num_players
-        self.board = Board(self.board_w, self.board_h, self.num_players, self.piece_list)
+        self.board = create_board(self.board_w, self.board_h, self.num_players, self.piece_list)
 
         # Set up initial corners for each player
         if self.num_players > 1:
-            self.board.connected[1, 0, self.board_w - 1] = True
+            self.board.set_starting_point(1, (0, self.board_w - 1))
             if self.num_players > 2:
-                self.board.connected[2, self.board_h - 1, 0] = True
+                self.board.set_starting_point(2, (self.board_h - 1, 0))
                 if self.num_players > 3:
-                    self.board.connected[3, self.board_h - 1, self.board_h - 1] = True
+                    self.board.set_starting_point(3, (self.board_h - 1, self.board_w - 1))
+        if getattr(self.board, 'track_moves', None) is not None:
+            self.board.track_moves()
 
     def play_turn(self):
         """
@@ -55,6 +59,7 @@ class GameEngine(object):
                 move = self.inputs[p].get_move(p, self.board)
                 if move is None:
                     self.passed[p] = True
+                    self.pass_turns[p] = self.turn_num
                     break
                 if not self.board.pieces[p, move.piece_index]:
                     print("Error: piece has already been used. Try again:")
@@ -75,6 +80,15 @@ class GameEngine(object):
                 return False
         return True
 
+    def close(self):
+        """
+        Closes the inputs, once the game is over
+        """
+        for player_input in self.inputs:
+            close = getattr(player_input, 'close', None)  # inputs of other modules may not be Inputs
+            if close is not None:
+                close()
+
     def _print_scores(self):
         for p in range(self.num_players):
             print("Player %d: %d pts" % (p + 1, self.score[p]))
@@ -83,16 +97,33 @@ class GameEngine(object):
         if len(self.inputs) != 4:
             print("Error: Need 4 players for a game. ")
             sys.exit(1)
-        while not self.all_players_passed():
-            self.play_turn()
+        try:
+            while not self.all_players_passed():
+                self.play_turn()
+        finally:
+            self.close()
 
         self._print_scores()
         return self.score
 
 
-def play_simple_search(problem, search_func):
+def create_display(width, height, graphics='gui'):
+    """
+    Returns the display for <graphics>: 'gui' for a Tk window, 'text' to print
+    the boards and 'none' to draw nothing
+    """
+    if graphics == 'gui':
+        return GuiDisplay(width, height, title='Intro to AI -- 67842 -- Practical - Ex1')
+    elif graphics == 'text':
+        return TextDisplay()
+    elif graphics == 'none':
+        return NoDisplay()
+    raise Exception('unrecognized graphics %s' % graphics)
+
+
+def play_simple_search(problem, search_func, graphics='gui'):
     back_trace = search_func(problem)
-    display = GuiDisplay(problem.board.board_w, problem.board.board_h, title='Intro to AI -- 67842 -- Practical - Ex1')
+    display = create_display(problem.board.board_w, problem.board.board_h, graphics)
     board = problem.get_start_state()
     if problem.__class__ == BlokusCornersProblem:
         dots = [(board.board_h - 1, board.board_w - 1), (0, board.board_w - 1), (board.board_h - 1, 0)]
@@ -107,9 +138,10 @@ def play_simple_search(problem, search_func):
     print("Expanded nodes: %d, score: %d" % (problem.expanded, board.score(0)))
 
 
-def play_a_star_search(problem, heuristic):
-    back_trace = astar(problem, heuristic)
-    display = GuiDisplay(problem.board.board_w, problem.board.board_h, title='Intro to AI -- 67842 -- Practical - Ex1')
+def play_a_star_search(problem, heuristic, search_func=astar, graphics='gui', **search_args):
+    stats = SearchStats()
+    back_trace = search_func(problem, heuristic, stats=stats, **search_args)
+    display = create_display(problem.board.board_w, problem.board.board_h, graphics)
     board = problem.get_start_state()
 
     if problem.__class__ == BlokusCornersProblem:
@@ -124,11 +156,12 @@ def play_a_star_search(problem, heuristic):
         board.add_move(0, action)
         display.draw_board(board, dots=dots)
     print("Expanded nodes: %d, score: %d" % (problem.expanded, board.score(0)))
+    print("Search stats: %s" % stats)
 
 
-def play_approximate_search(problem):
+def play_approximate_search(problem, graphics='gui'):
     back_trace = problem.solve()
-    display = GuiDisplay(problem.board.board_w, problem.board.board_h, title='Intro to AI -- 67842 -- Practical - Ex1')
+    display = create_display(problem.board.board_w, problem.board.board_h, graphics)
     board = problem.get_start_state()
     for action in back_trace:
         board.add_move(0, action)
@@ -136,6 +169,28 @@ def play_approximate_search(problem):
     print("Expanded nodes: %d, score: %d" % (problem.expanded, board.score(0)))
 
 
+def create_problem(puzzle, size, piece_list, start=(0, 0), targets=()):
+    """
+    Returns the problem of type <puzzle> (the -z option of main) on a board
+    of <size> (as given to -s)
+    """
+    board_w, board_h = size[1], size[0]
+    if (puzzle == 'cover' or puzzle == 'sub-optimal') and len(targets) == 0:
+        raise Exception('cover puzzles require at least one point to cover!')
+
+    if puzzle == 'fill':
+        return BlokusFillProblem(board_w, board_h, piece_list, start)
+    elif puzzle == 'corners':
+        return BlokusCornersProblem(board_w, board_h, piece_list, start)
+    elif puzzle == 'cover':
+        return BlokusCoverProblem(board_w, board_h, piece_list, start, list(targets))
+    elif puzzle == 'sub-optimal':
+        return ClosestLocationSearch(board_w, board_h, piece_list, start, list(targets))
+    elif puzzle == 'mini-contest':
+        return MiniContestSearch(board_w, board_h, piece_list, start, list(targets))
+    raise Exception('unrecognized puzzle %s' % puzzle)
+
+
 def load_heuristic(heuristic_name):
     # Looks through all pythonPath Directories for the right function
     python_path_str = os.path.expandvars("$PYTHONPATH")
@@ -170,6 +225,9 @@ def main():
                   - starts a game between 4 random agents
                (2) python game.py -p tiny_set.txt -s 4 7
                OR  python game.py -s 14 14 -f ucs -z cover [(1, 1), (5, 9), (9, 6)]
+               (3) python game.py -s 10 10 -f smastar -m 5000 -H blokus_cover_heuristic -z cover [(2, 2), (5, 5)]
+               (4) python game.py -q -s 14 14 -z sub-optimal [(5, 5), (10, 3)]
+                  - solves without drawing, e.g. on a machine without a display
     """
     parser = OptionParser(usage_str)
 
@@ -182,17 +240,28 @@ def main():
                       metavar='FUNC',
                       help='search function to use. This option is ignored for sub-optimal search. ',
                       type='choice',
-                      choices=['dfs', 'bfs', 'ucs', 'astar'], default='dfs')
+                      choices=['dfs', 'bfs', 'ucs', 'astar', 'idastar', 'smastar'], default='dfs')
     parser.add_option('-H', '--heuristic', dest='h_func',
-                      help='heuristic function to use for A* search. \
+                      help='heuristic function to use for A*, IDA* and SMA* search. \
                       This option is ignored for other search functions. ',
                       metavar='FUNC', default=None)
+    parser.add_option('-m', '--max-nodes', dest='max_nodes', type='int',
+                      help='the most nodes SMA* search may hold, its fringe and their ancestors together. \
+                      This option is ignored for other search functions. ',
+                      default=100000)
     parser.add_option('-z', '--puzzle', dest='puzzle',
                       help='the type of puzzle being solved', type='choice',
                       choices=['fill', 'diagonal', 'corners', 'cover', 'sub-optimal', 'mini-contest'],
                       default=None)
     parser.add_option('-x', '--start-point', dest='start', type='int', nargs=2,
                       help='starting point', default=(0, 0))
+    parser.add_option('-b', '--board-backend', dest='board_backend', type='choice',
+                      help='board representation: NumPy arrays or integer bitboards',
+                      choices=list(BOARD_BACKENDS), default='array')
+    parser.add_option('-q', '--no-graphics', action='store_true', dest='no_graphics',
+                      help='do not draw the boards, and exit without waiting for Enter', default=False)
+    parser.add_option('-t', '--text-graphics', action='store_true', dest='text_graphics',
+                      help='print the boards to the terminal instead of drawing them in a window', default=False)
 
     options, cover_points = parser.parse_args()
     if (options.puzzle == 'cover' or options.puzzle == 'sub-optimal') and len(cover_points) == 0:
@@ -201,43 +270,50 @@ def main():
     if options.puzzle == 'cover' or options.puzzle == 'sub-optimal' or options.puzzle == 'mini-contest':
         targets = ast.literal_eval(''.join(cover_points))
 
+    if options.no_graphics:
+        graphics = 'none'
+    elif options.text_graphics:
+        graphics = 'text'
+    else:
+        graphics = 'gui'
+
+    set_board_backend(options.board_backend)
     piece_list = PieceList(options.pieces_file)
 
     if options.puzzle is None:
         inputs = [RandomInput() for _ in range(4)]
-        engine = GameEngine(inputs, options.size[1], options.size[0], piece_list)
+        engine = GameEngine(inputs, options.size[1], options.size[0], piece_list, graphics)
         engine.play_game()
 
-    elif options.puzzle == 'sub-optimal':
-        problem = ClosestLocationSearch(options.size[1], options.size[0], piece_list, options.start, targets)
-        play_approximate_search(problem)
-
-    elif options.puzzle == 'mini-contest':
-        problem = MiniContestSearch(options.size[1], options.size[0], piece_list, options.start, targets)
-        play_approximate_search(problem)
+    elif options.puzzle == 'sub-optimal' or options.puzzle == 'mini-contest':
+        problem = create_problem(options.puzzle, options.size, piece_list, options.start, targets)
+        play_approximate_search(problem, graphics)
 
-    elif options.search_func in ['dfs', 'bfs', 'ucs', 'astar']:
-        if options.puzzle == 'fill':
-            problem = BlokusFillProblem(options.size[1], options.size[0], piece_list, options.start)
-        elif options.puzzle == 'corners':
-            problem = BlokusCornersProblem(options.size[1], options.size[0], piece_list, options.start)
-        elif options.puzzle == 'cover':
-            problem = BlokusCoverProblem(options.size[1], options.size[0], piece_list, options.start, targets)
+    elif options.search_func in ['dfs', 'bfs', 'ucs', 'astar', 'idastar', 'smastar']:
+        problem = create_problem(options.puzzle, options.size, piece_list, options.start,
+                                 targets if options.puzzle == 'cover' else ())
 
         if options.search_func in ['dfs', 'bfs', 'ucs']:
             search = __import__('search')
-            play_simple_search(problem, getattr(search, options.search_func))
+            play_simple_search(problem, getattr(search, options.search_func), graphics)
         elif options.search_func == 'astar':
-            play_a_star_search(problem, load_heuristic(options.h_func))
+            play_a_star_search(problem, load_heuristic(options.h_func), graphics=graphics)
+        elif options.search_func == 'idastar':
+            play_a_star_search(problem, load_heuristic(options.h_func), idastar, graphics)
+        elif options.search_func == 'smastar':
+            play_a_star_search(problem, load_heuristic(options.h_func), smastar, graphics,
+                               max_nodes=options.max_nodes)
     else:
         raise Exception('unrecognized options')
+    return graphics
 
 
 if __name__ == "__main__":
     import time
 
     start_time = time.time()
-    main()
+    graphics = main()
     end_time = time.time()
     print(end_time - start_time)
-    input("Press Enter to continue...")
+    if graphics == 'gui':
+        input("Press Enter to continue...")
@@ -0,0 +1,116 @@
+"""
+The geometry of a Blokus board as integer bitboards: cell masks and the
+placement masks of every piece, shared by the BitBoard backend and the
+frontier distances of either backend.
+"""
+
+import numpy as np
+
+
+class BoardGeometry:
+    """
+    Everything about a board that only depends on its size and its pieces.
+    Shared (never copied) by all the BitBoards of a search.
+
+    Cell (x, y) is bit y * stride + x, where stride = board_w + 1. The extra
+    column is always empty so shifting a mask by one bit never wraps a tile
+    from the end of one row to the start of the next.
+
+    The BoardGeometry stores:
+    - full: mask of every cell on the board
+    - not_left/not_right: masks of the cells that have a left/right neighbour
+    - placements: placements[piece_index][orientation] maps (x, y) to the mask
+      of the piece placed there, for every in-bounds placement
+    """
+
+    def __init__(self, board_w, board_h, piece_list):
+        self.board_w = board_w
+        self.board_h = board_h
+        self.stride = board_w + 1
+
+        row = (1 << board_w) - 1
+        self.full = 0
+        for y in range(board_h):
+            self.full |= row << (y * self.stride)
+        self.not_left = self.full & ~self._column(0)
+        self.not_right = self.full & ~self._column(board_w - 1)
+
+        self.placements = []
+        for piece_index, piece in enumerate(piece_list):
+            piece_placements = {}
+            for ori in piece.orientation_list:
+                base = 0
+                for (dx, dy) in ori:
+                    base |= 1 << (dy * self.stride + dx)
+                (width, height) = piece_list.orientation_sizes[piece_list.get_orientation_row(piece_index, ori)]
+                piece_placements[ori] = {
+                    (x, y): base << (y * self.stride + x)
+                    for x in range(board_w - width + 1) for y in range(board_h - height + 1)}
+            self.placements.append(piece_placements)
+
+    def _column(self, x):
+        column = 0
+        for y in range(self.board_h):
+            column |= 1 << (y * self.stride + x)
+        return column
+
+    def bit(self, x, y):
+        return 1 << (y * self.stride + x)
+
+    def cells(self, mask):
+        """
+        Returns the (x, y) cells set in <mask>
+        """
+        cells = []
+        while mask:
+            low = mask & -mask
+            index = low.bit_length() - 1
+            cells.append((index % self.stride, index // self.stride))
+            mask ^= low
+        return cells
+
+    def to_array(self, mask):
+        """
+        Returns <mask> as a (board_h, board_w) boolean array
+        """
+        array = np.zeros((self.board_h, self.board_w), np.bool_)
+        for (x, y) in self.cells(mask):
+            array[y, x] = True
+        return array
+
+    def from_array(self, array):
+        """
+        Returns the mask of the True cells of a (board_h, board_w) array
+        """
+        mask = 0
+        for (y, x) in np.argwhere(array):
+            mask |= self.bit(int(x), int(y))
+        return mask
+
+    def sides(self, mask):
+        """
+        Returns the cells sharing an edge with a cell of <mask>
+        """
+        return ((mask & self.not_left) >> 1 | (mask & self.not_right) << 1 |
+                mask >> self.stride | mask << self.stride) & self.full
+
+    def diagonals(self, mask):
+        """
+        Returns the cells sharing only a corner with a cell of <mask>
+        """
+        left = (mask & self.not_left) >> 1
+        right = (mask & self.not_right) << 1
+        return ((left | right) >> self.stride | (left | right) << self.stride) & self.full
+
+
+_geometry_cache = {}
+
+
+def get_geometry(board_w, board_h, piece_list):
+    """
+    Returns the (cached) BoardGeometry for this board size and piece list
+    """
+    key = (board_w, board_h, piece_list)
+    if key not in _geometry_cache:
+        _geometry_cache[key] = BoardGeometry(board_w, board_h, piece_list)
+    return _geometry_cache[key]
@@ -0,0 +1,171 @@
+"""
+Tables the Blokus search heuristics read instead of working them out again
+for every state: the distances from a player's frontier, kept up to date on
+the board itself (see Board.get_frontier_distances), and the prefix sums of
+the sizes of their unused pieces.
+"""
+
+import functools
+
+import numpy as np
+
+from pieces import MAX_TILES
+
+CACHE_SIZE = 2 ** 16  # the most entries each of the caches below keeps, least recently used out first
+
+
+class FrontierDistances:
+    """
+    The fewest tiles a player must place to cover each cell: 0 for their own
+    tiles, 1 for their anchors and one more for every step to any of the 8
+    neighbours through the cells legal for them; inf if they never can. The
+    tiles placed to reach a cell form such a chain, and legal cells only ever
+    become illegal, so it never overestimates.
+
+    Kept as bitboards over a geometry.BoardGeometry:
+    - legal: the mask of cells the player may cover
+    - within: within[d] is the mask of the cells at most d tiles away, the
+      last one holding every cell they can reach
+    """
+    __slots__ = ('geometry', 'legal', 'within')
+
+    def __init__(self, geometry, legal, own, anchors):
+        self.geometry = geometry
+        self.legal = legal
+        self.within = [own]
+        reached = own
+        frontier = anchors & legal
+        while frontier:
+            reached |= frontier
+            self.within.append(reached)
+            frontier = self._grow(frontier) & legal & ~reached
+
+    def _grow(self, mask):
+        return mask | self.geometry.sides(mask) | self.geometry.diagonals(mask)
+
+    def get_distance(self, x, y):
+        bit = self.geometry.bit(x, y)
+        for (distance, cells) in enumerate(self.within):
+            if cells & bit:
+                return distance
+        return float('inf')
+
+    def to_array(self):
+        """
+        Returns the distances as a (board_h, board_w) array
+        """
+        distances = np.full((self.geometry.board_h, self.geometry.board_w), np.inf)
+        for (distance, cells) in reversed(list(enumerate(self.within))):
+            distances[self.geometry.to_array(cells)] = distance
+        return distances
+
+    def add_move(self, mask, own):
+        """
+        Updates the distances after a move covering <mask>, by this player if
+        <own>.
+
+        Cells that became illegal drop out, and the new anchors spread out
+        from as far as they bring cells closer. Cells whose chain went through
+        a cell that became illegal keep their old distance: it may fall behind
+        the distances built from scratch, but never goes over them, so it stays
+        a lower bound. A move of k tiles brings no cell more than k closer, so
+        heuristics reading it stay consistent.
+        """
+        if not own:
+            self.legal &= ~mask
+            self.within = [cells & ~mask for cells in self.within]
+            return
+
+        self.legal &= ~(mask | self.geometry.sides(mask))
+        own_tiles = self.within[0] | mask
+        within = [cells & self.legal | own_tiles for cells in self.within]
+
+        wave = self.geometry.diagonals(mask) & self.legal
+        spread = 0  # the cells brought closer so far
+        distance = 1
+        while True:
+            if distance == len(within):
+                within.append(within[-1])
+            wave &= ~within[distance] & ~spread
+            if not wave:
+                break
+            spread |= wave
+            within[distance] |= spread
+            wave = self._grow(wave) & self.legal
+            distance += 1
+        for later in range(distance, len(within)):
+            within[later] |= spread
+        if within[-1] == within[-2]:
+            within.pop()
+        self.within = within
+
+    def __copy__(self):
+        cpy_distances = FrontierDistances.__new__(FrontierDistances)
+        cpy_distances.geometry = self.geometry
+        cpy_distances.legal = self.legal
+        cpy_distances.within = self.within[:]
+        return cpy_distances
+
+
+def update_frontier_distances(distances, player, move):
+    """
+    Updates <distances>, per player None or their FrontierDistances, after
+    <player> played <move>
+    """
+    mask = None
+    for (p, player_distances) in enumerate(distances):
+        if player_distances is not None:
+            if mask is None:
+                mask = player_distances.geometry.placements[move.piece_index][move.orientation][(move.x, move.y)]
+            player_distances.add_move(mask, p == player)
+
+
+def _spread_out(cells, spacing):
+    """
+    Returns a subset of the (distance, row, column) <cells>, at least
+    <spacing> apart from each other (in both or either direction)
+    """
+    chosen = []
+    for (distance, row, col) in cells:
+        if all(max(abs(row - other_row), abs(col - other_col)) >= spacing for (_, other_row, other_col) in chosen):
+            chosen.append((distance, row, col))
+    return chosen
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def get_cover_bounds(uncovered):
+    """
+    Returns the (cached) lower bounds (tiles, pieces) on what a player must
+    place to cover all the <uncovered> cells, given farthest first as
+    (distance, row, column) with their (finite) FrontierDistances distance.
+
+    The tiles are the most of:
+    - the distance of the farthest cell
+    - for any k, what the chains reaching cells at least 2k - 1 apart need
+      less than k cells away from them: min(distance, k) tiles each
+    and the pieces are one per cell further apart from the others than the
+    longest piece spans.
+    """
+    num_tiles = uncovered[0][0]
+    for k in range(1, int(num_tiles) + 1):
+        spread_out = _spread_out(uncovered, 2 * k - 1)
+        if len(spread_out) == 1:  # and so for any larger k
+            break
+        num_tiles = max(num_tiles, sum(min(distance, k) for (distance, _, _) in spread_out))
+    return num_tiles, len(_spread_out(uncovered, MAX_TILES))
+
+
+def get_piece_size_prefix_sums(piece_list, unused):
+    """
+    Returns the (cached) prefix sums of the sizes of the pieces of
+    <piece_list> that are True in <unused> (a row of Board.pieces), smallest
+    first: [k] is the fewest tiles any k of them have
+    """
+    return _piece_size_prefix_sums(piece_list, unused.tobytes())
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _piece_size_prefix_sums(piece_list, unused_bytes):
+    unused = np.frombuffer(unused_bytes, np.bool_)
+    sizes = sorted(piece.get_num_tiles() for (piece, free) in zip(piece_list, unused) if free)
+    return [0] + np.cumsum(sizes).tolist()
@@ -1,3 +1,9 @@
+import math
+import multiprocessing
+import random
+import time
+
+
 class Input(object):
     """
     The Input class defines an interface for the game engine to get input
@@ -25,6 +31,19 @@ class Input(object):
         """
         raise NotImplementedError(Input.input_error_string)
 
+    def close(self):
+        """
+        Releases what the input holds on to (such as worker processes) once
+        its game is over. Inputs are also context managers that close on exit.
+        """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
 
 class RandomInput(Input):
     """RandomInput players choose random moves (equally distributed over piece
@@ -39,3 +58,214 @@ class RandomInput(Input):
             return move_list[random.randint(0, len(move_list) - 1)]
         # else
         return None
+
+
+def _next_player(board, player):
+    """
+    Returns the player moving after <player> (possibly <player> again, if the
+    others are stuck), or None if no one can move any more. A player without
+    legal moves never gets one back, so they are out for good.
+    """
+    for i in range(1, board.num_players + 1):
+        next_player = (player + i) % board.num_players
+        if board.has_legal_moves(next_player):
+            return next_player
+    return None
+
+
+def _move_key(move):
+    return move.piece_index, move.orientation, move.x, move.y
+
+
+class _MctsNode(object):
+    """
+    A node of the MCTS tree: <board> with <player> to move (None once the
+    game is over), reached from its parent by <move>.
+
+    rewards[p] is the sum of player p's rewards over the <visits> rollouts
+    through this node.
+    """
+
+    __slots__ = ('board', 'player', 'parent', 'move', 'children', 'untried', 'visits', 'rewards')
+
+    def __init__(self, board, player, parent=None, move=None):
+        self.board = board
+        self.player = player
+        self.parent = parent
+        self.move = move
+        self.children = []
+        self.untried = None  # moves not expanded yet, generated on the first visit
+        self.visits = 0
+        self.rewards = [0.0] * board.num_players
+
+    def select_child(self, exploration):
+        """
+        Returns the child with the best UCT value for the player to move
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: child.rewards[self.player] / child.visits +
+                   exploration * math.sqrt(log_visits / child.visits))
+
+
+def _rollout_rewards(board, player):
+    """
+    Plays random moves on <board> (which is modified) from <player>'s turn to
+    the end of the game. Returns each player's reward: 1 for the best score,
+    shared between ties, 0 otherwise.
+
+    Players take turns in order, skipping the ones that are out: each one's
+    legal moves are found once per turn, and an empty list puts them out.
+    """
+    out = set()  # the players without legal moves, who never get one back
+    while player is not None and len(out) < board.num_players:
+        if player not in out:
+            moves = board.get_legal_moves(player)
+            if moves:
+                board.add_move(player, moves[random.randrange(len(moves))])
+            else:
+                out.add(player)
+        player = (player + 1) % board.num_players
+
+    scores = [board.score(p) for p in range(board.num_players)]
+    best = max(scores)
+    winners = scores.count(best)
+    return [1.0 / winners if score == best else 0.0 for score in scores]
+
+
+def mcts_search(root, deadline, exploration, max_iterations=None):
+    """
+    Runs MCTS iterations from <root> until <deadline> (a time.perf_counter()
+    value) or <max_iterations>, and returns the number of iterations run
+    """
+    iterations = 0
+    while time.perf_counter() < deadline and (max_iterations is None or iterations < max_iterations):
+        # Selection
+        node = root
+        while node.player is not None and node.untried == [] and node.children:
+            node = node.select_child(exploration)
+
+        # Expansion
+        if node.player is not None:
+            if node.untried is None:
+                node.untried = node.board.get_legal_moves(node.player)
+            if node.untried:
+                move = node.untried.pop(random.randrange(len(node.untried)))
+                child_board = node.board.do_move(node.player, move)
+                child = _MctsNode(child_board, _next_player(child_board, node.player), node, move)
+                node.children.append(child)
+                node = child
+
+        # Simulation
+        rewards = _rollout_rewards(node.board.__copy__(), node.player)
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            for p in range(len(rewards)):
+                node.rewards[p] += rewards[p]
+            node = node.parent
+        iterations += 1
+    return iterations
+
+
+def _mcts_worker(args):
+    """
+    Root parallelization: searches an independent tree and returns the
+    visits of each root move and the number of iterations run
+    """
+    board, player, time_budget, exploration, max_iterations, seed = args
+    random.seed(seed)
+    root = _MctsNode(board, player)
+    iterations = mcts_search(root, time.perf_counter() + time_budget, exploration, max_iterations)
+    return {_move_key(child.move): child.visits for child in root.children}, iterations
+
+
+class MctsInput(Input):
+    """MctsInput players choose the move most visited by a Monte Carlo tree
+    search (UCT, with random rollouts) run for <time_budget> seconds per
+    move, or <max_iterations> iterations if given.
+
+    With processes > 1, that many independent trees are searched in worker
+    processes and their root visits added up (root parallelization);
+    otherwise the subtree of the position reached is kept for the next move.
+    Worker processes can't be started from a daemonic process, such as the
+    workers of a parallel tournament. They are started on the first move
+    and kept until close().
+
+    iterations and search_time add up over all the moves, for
+    iterations_per_second; with verbose=True every move reports them.
+    """
+
+    def __init__(self, time_budget=1.0, exploration=0.7, processes=1, max_iterations=None, verbose=False):
+        self.time_budget = time_budget
+        self.exploration = exploration
+        self.processes = processes
+        self.max_iterations = max_iterations
+        self.verbose = verbose
+        self.iterations = 0
+        self.search_time = 0.0
+        self._root = None
+        self._pool = None
+
+    def iterations_per_second(self):
+        return self.iterations / self.search_time if self.search_time else 0.0
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        self._root = None
+
+    def get_move(self, player, board):
+        move_list = board.get_legal_moves(player)
+        if len(move_list) <= 1:
+            return move_list[0] if move_list else None
+
+        start_time = time.perf_counter()
+        if self.processes > 1:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self.processes)
+            jobs = [(board, player, self.time_budget, self.exploration, self.max_iterations, random.getrandbits(32))
+                    for _ in range(self.processes)]
+            visits = {}
+            iterations = 0
+            for (worker_visits, worker_iterations) in self._pool.map(_mcts_worker, jobs):
+                for key, count in worker_visits.items():
+                    visits[key] = visits.get(key, 0) + count
+                iterations += worker_iterations
+        else:
+            root = self._find_root(player, board)
+            iterations = mcts_search(root, start_time + self.time_budget, self.exploration, self.max_iterations)
+            visits = {_move_key(child.move): child.visits for child in root.children}
+            self._root = root
+
+        search_time = time.perf_counter() - start_time
+        self.iterations += iterations
+        self.search_time += search_time
+        if self.verbose:
+            print("MCTS player %d: %d iterations in %.2f s (%.0f/s)" %
+                  (player + 1, iterations, search_time, iterations / search_time))
+
+        best_key = max(visits, key=visits.get) if visits else None
+        for move in move_list:
+            if _move_key(move) == best_key:
+                if self._root is not None:
+                    self._root = next(child for child in self._root.children if child.move is not None and
+                                      _move_key(child.move) == best_key)
+                return move
+        return move_list[random.randrange(len(move_list))]
+
+    def _find_root(self, player, board):
+        """
+        Returns the node of the kept subtree matching <board> with <player> to
+        move, or a new root if the other players' moves left the tree
+        """
+        layer = [self._root] if self._root is not None else []
+        for _ in range(board.num_players + 1):
+            for node in layer:
+                if node.player == player and node.board == board:
+                    node.parent = None
+                    return node
+            layer = [child for node in layer for child in node.children]
+        return _MctsNode(board.__copy__(), player)
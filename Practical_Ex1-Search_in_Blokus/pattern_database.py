@@ -0,0 +1,165 @@
+"""
+Builds disjoint additive pattern databases for the eight puzzle and the
+fifteen puzzle of eightpuzzle.py, and a heuristic that adds them up.
+
+USAGE:      python pattern_database.py [-s <side>] [-d <directory>]
+EXAMPLE:    python pattern_database.py -s 4
+
+A pattern is a set of tiles. Its database holds, for every placement of
+those tiles, the fewest moves of pattern tiles that bring them home, taking
+moves of the other tiles as free. It is built once by a breadth first search
+backwards from the goal, saved as a .npy file in a per-user cache directory
+and memory-mapped when loaded.
+The patterns of a puzzle are disjoint, so every move counts in one database
+at most, and the sum of the databases never overestimates.
+"""
+
+import os
+from optparse import OptionParser
+
+import numpy as np
+
+DEFAULT_PATTERNS = {3: ((1, 2, 3, 4), (5, 6, 7, 8)),
+                    4: ((1, 2, 3, 6, 7), (4, 5, 8, 9, 12), (10, 11, 13, 14, 15))}
+USER_CACHE_DIRECTORY = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+DEFAULT_DIRECTORY = os.path.join(USER_CACHE_DIRECTORY, 'sliding_puzzles', 'pattern_databases')
+UNREACHED = 255
+
+
+def _neighbour_table(side):
+    """
+    Returns a (side * side, 4) array of the cells next to each cell, or -1
+    where there is none
+    """
+    neighbours = np.full((side * side, 4), -1, np.int64)
+    for cell in range(side * side):
+        row, col = divmod(cell, side)
+        for direction, (d_row, d_col) in enumerate(((-1, 0), (1, 0), (0, -1), (0, 1))):
+            if 0 <= row + d_row < side and 0 <= col + d_col < side:
+                neighbours[cell, direction] = cell + d_row * side + d_col
+    return neighbours
+
+
+def build_pattern_database(side, pattern):
+    """
+    Returns the pattern database of the tiles in <pattern> on a <side> x <side>
+    puzzle, whose goal is the blank in the top left corner and every tile t in
+    cell t (row-major). It is a uint8 array indexed by the placement of the
+    pattern tiles, sum(cell of pattern[i] * (side * side) ** i). Placements
+    putting two tiles in one cell are UNREACHED.
+    """
+    num_cells = side * side
+    num_placements = num_cells ** len(pattern)
+    powers = num_cells ** np.arange(len(pattern), dtype=np.int64)
+    neighbours = _neighbour_table(side)
+
+    # A search state is a placement and the cell of the blank: blank * num_placements + placement
+    distances = np.full(num_cells * num_placements, UNREACHED, np.uint8)
+    frontier = np.array([int(np.dot(pattern, powers))], np.int64)
+    distances[frontier] = 0
+    depth = 0
+    while frontier.size:
+        # The blank moves to cells without pattern tiles for free, so spread the frontier over those first
+        layer = [frontier]
+        while frontier.size:
+            blanks, placements = np.divmod(frontier, num_placements)
+            cells = placements[:, None] // powers % num_cells
+            reached = []
+            for direction in range(4):
+                targets = neighbours[blanks, direction]
+                free = (targets >= 0) & ~(cells == targets[:, None]).any(axis=1)
+                reached.append(targets[free] * num_placements + placements[free])
+            frontier = np.unique(np.concatenate(reached))
+            frontier = frontier[distances[frontier] == UNREACHED]
+            distances[frontier] = depth
+            layer.append(frontier)
+
+        # Swapping the blank with a pattern tile costs one move
+        layer = np.concatenate(layer)
+        blanks, placements = np.divmod(layer, num_placements)
+        cells = placements[:, None] // powers % num_cells
+        reached = []
+        for direction in range(4):
+            targets = neighbours[blanks, direction]
+            for tile in range(len(pattern)):
+                moved = (targets >= 0) & (cells[:, tile] == targets)
+                reached.append(targets[moved] * num_placements + placements[moved] +
+                               (blanks[moved] - targets[moved]) * powers[tile])
+        frontier = np.unique(np.concatenate(reached))
+        frontier = frontier[distances[frontier] == UNREACHED]
+        depth += 1
+        distances[frontier] = depth
+
+    return distances.reshape(num_cells, num_placements).min(axis=0)
+
+
+def database_file(directory, side, pattern):
+    return os.path.join(directory, 'pdb_%dx%d_%s.npy' % (side, side, '-'.join(str(tile) for tile in pattern)))
+
+
+def save_pattern_databases(side, patterns=None, directory=DEFAULT_DIRECTORY):
+    """
+    Builds the pattern databases of <patterns> (by default, the
+    DEFAULT_PATTERNS of <side>) and saves them to <directory>
+    """
+    os.makedirs(directory, exist_ok=True)
+    for pattern in patterns or DEFAULT_PATTERNS[side]:
+        np.save(database_file(directory, side, pattern), build_pattern_database(side, pattern))
+
+
+_databases_cache = {}
+
+
+def get_pattern_databases(side, patterns=None, directory=DEFAULT_DIRECTORY):
+    """
+    Returns a (pattern, index weights, memory-mapped table) triple per pattern
+    of <patterns> (by default, the DEFAULT_PATTERNS of <side>), building and
+    saving the tables missing from <directory> first
+    """
+    patterns = tuple(tuple(pattern) for pattern in patterns or DEFAULT_PATTERNS[side])
+    key = (side, patterns, directory)
+    if key not in _databases_cache:
+        missing = [pattern for pattern in patterns if not os.path.exists(database_file(directory, side, pattern))]
+        if missing:
+            save_pattern_databases(side, missing, directory)
+        _databases_cache[key] = [(pattern, [(side * side) ** i for i in range(len(pattern))],
+                                  np.load(database_file(directory, side, pattern), mmap_mode='r'))
+                                 for pattern in patterns]
+    return _databases_cache[key]
+
+
+def pattern_database_heuristic(state, problem=None):
+    """
+    The sum of the default pattern databases of the puzzle <state> belongs to
+    (see get_pattern_databases)
+    """
+    cells = [0] * (state.size * state.size)  # the cell of every tile
+    for cell, tile in enumerate(state.get_numbers()):
+        cells[tile] = cell
+    total = 0
+    for pattern, weights, table in get_pattern_databases(state.size):
+        total += int(table[sum(cells[tile] * weight for tile, weight in zip(pattern, weights))])
+    return total
+
+
+def main():
+    parser = OptionParser(__doc__.split('\n\n')[1])
+    parser.add_option('-s', '--side', dest='side', type='int',
+                      help='the number of rows of the puzzle: 3 for the eight puzzle, 4 for the fifteen puzzle',
+                      default=3)
+    parser.add_option('-d', '--directory', dest='directory', help='the directory to save the databases to',
+                      default=DEFAULT_DIRECTORY)
+
+    options, _ = parser.parse_args()
+    if options.side not in DEFAULT_PATTERNS:
+        parser.error('no default patterns for side %d' % options.side)
+    save_pattern_databases(options.side, directory=options.directory)
+    for pattern in DEFAULT_PATTERNS[options.side]:
+        table = np.load(database_file(options.directory, options.side, pattern))
+        reached = table[table != UNREACHED]
+        print("pattern %s: %d placements, mean %.2f moves, max %d moves, %d KB" %
+              (pattern, reached.size, reached.mean(), reached.max(), table.nbytes // 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,13 @@
 import os
 
+import numpy as np
+
 """
 Classes and utilities to describe all of the game pieces.
 """
 
+MAX_TILES = 5
+
 
 def negate_list_positive(lst):
     """
@@ -36,8 +40,8 @@ class Piece(object):
                 "Length of x and y lists are unequal (%d and %d)" % (len(x_list), len(y_list)))
         if len(x_list) == 0:
             raise ValueError("No tiles provided!")
-        if len(x_list) > 5:
-            raise ValueError("%d tiles provided; maximum 5" % len(x_list))
+        if len(x_list) > MAX_TILES:
+            raise ValueError("%d tiles provided; maximum %d" % (len(x_list), MAX_TILES))
 
         minx = min(x_list)
         miny = min(y_list)
@@ -82,6 +86,14 @@ class Piece(object):
         self.num_tiles = len(x_list)
         self.orientations = frozenset(self.orientations)
 
+        # Orientations in iteration order, and a flat table of every
+        # (orientation index, tile offset) pair. Placing tile (dx, dy) of an
+        # orientation on cell (ax, ay) puts the piece's origin at (ax-dx, ay-dy)
+        self.orientation_list = tuple(self.orientations)
+        self.anchor_offsets = tuple((ori_index, dx, dy)
+                                    for ori_index, ori in enumerate(self.orientation_list)
+                                    for (dx, dy) in ori)
+
         self.x = x_list
         self.y = y_list
 
@@ -118,10 +130,99 @@ class Piece(object):
         return self.orientations.__hash__()
 
 
+_piece_file_cache = {}
+
+
+def read_pieces(path):
+    """
+    Returns the pieces in the file at <path> (see PieceList) and their
+    orientation tables. Files are cached, and read again only if they changed
+    on disk; the cached pieces and tables are shared and must not be modified.
+    """
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    if key not in _piece_file_cache:
+        with open(path) as f:
+            lines = f.read().splitlines()
+
+        pieces = []
+        n = int(lines[0])
+        line_index = 1
+        for i in range(n):
+            x_origin = 0
+            y_origin = 0
+
+            x_list = []
+            y_list = []
+
+            num_lines = int(lines[line_index])
+            for j in range(num_lines):
+                line = lines[line_index + 1 + j]
+                for k in range(len(line)):
+                    if line[k] in ('O', 'o', '0'):
+                        x_origin = k
+                        y_origin = j
+                    if line[k] != ' ':
+                        x_list.append(k)
+                        y_list.append(j)
+
+            x_list = [x - x_origin for x in x_list]
+            y_list = [y - y_origin for y in y_list]
+            pieces.append(Piece(x_list, y_list))
+
+            line_index += 1 + num_lines
+        _piece_file_cache[key] = (tuple(pieces), orientation_tables(pieces))
+    return _piece_file_cache[key]
+
+
+def orientation_tables(pieces):
+    """
+    Returns the piece ids, orientation rows and orientation arrays of
+    <pieces>, in the order PieceList stores them
+    """
+    piece_ids = {}
+    for piece_index, piece in enumerate(pieces):
+        piece_ids.setdefault(piece, piece_index)
+
+    orientation_rows = {}
+    offsets = []
+    sizes = []
+    num_tiles = []
+    orientation_pieces = []
+    piece_orientations = np.zeros(len(pieces) + 1, np.intp)
+    for piece_index, piece in enumerate(pieces):
+        for ori in piece.orientation_list:
+            orientation_rows[(piece_index, ori)] = len(offsets)
+            tiles = sorted(ori)
+            offsets.append(tiles + [tiles[0]] * (MAX_TILES - len(tiles)))
+            sizes.append((max(dx for (dx, _) in tiles) + 1, max(dy for (_, dy) in tiles) + 1))
+            num_tiles.append(len(tiles))
+            orientation_pieces.append(piece_index)
+        piece_orientations[piece_index + 1] = len(offsets)
+
+    return (piece_ids, orientation_rows,
+            np.array(offsets, np.intp).reshape((len(offsets), MAX_TILES, 2)),
+            np.array(sizes, np.intp).reshape((len(sizes), 2)),
+            np.array(num_tiles, np.intp),
+            np.array(orientation_pieces, np.intp),
+            piece_orientations)
+
+
 class PieceList(object):
     """
     The PieceList class stores a list of all of the Blokus game pieces (the
     distinct 5-polyominos).
+
+    Besides the pieces, it holds NumPy tables with one row per orientation of
+    every piece (piece by piece, each in its orientation_list order):
+    - orientation_offsets: (num_orientations, MAX_TILES, 2) array of the
+      (dx, dy) tile offsets. Rows of smaller pieces repeat their first tile,
+      which never changes whether a placement is legal or attached
+    - orientation_sizes: (num_orientations, 2) array of the (width, height)
+      of each orientation's bounding box
+    - orientation_num_tiles: the number of tiles of each orientation
+    - orientation_pieces: the piece index of each orientation
+    - piece_orientations: piece n's rows are piece_orientations[n] to
+      piece_orientations[n + 1]
     """
 
     def __init__(self, fname=None):
@@ -142,37 +243,32 @@ class PieceList(object):
         1
         ##O##
         """
-        self.pieces = []
         directory = "layouts"
         if fname is not None:
-            with open(os.path.join(directory, fname)) as f:
-                lines = f.read().splitlines()
-
-            n = int(lines[0])
-            line_index = 1
-            for i in range(n):
-                x_origin = 0
-                y_origin = 0
-
-                x_list = []
-                y_list = []
-
-                num_lines = int(lines[line_index])
-                for j in range(num_lines):
-                    line = lines[line_index + 1 + j]
-                    for k in range(len(line)):
-                        if line[k] in ('O', 'o', '0'):
-                            x_origin = k
-                            y_origin = j
-                        if line[k] is not ' ':
-                            x_list.append(k)
-                            y_list.append(j)
-
-                x_list = [x - x_origin for x in x_list]
-                y_list = [y - y_origin for y in y_list]
-                self.pieces.append(Piece(x_list, y_list))
-
-                line_index += 1 + num_lines
+            pieces, tables = read_pieces(os.path.join(directory, fname))
+            self.pieces = list(pieces)
+        else:
+            self.pieces = []
+            tables = orientation_tables(self.pieces)
+        self._set_tables(tables)
+
+    def _set_tables(self, tables):
+        (self._piece_ids, self._orientation_rows, self.orientation_offsets, self.orientation_sizes,
+         self.orientation_num_tiles, self.orientation_pieces, self.piece_orientations) = tables
+
+    def get_piece_index(self, piece):
+        """
+        Return the index of <piece> in this list (of the first equal piece, if
+        the list holds the same piece twice).
+        """
+        return self._piece_ids[piece]
+
+    def get_orientation_row(self, piece_index, orientation):
+        """
+        Return the row of the orientation tables describing <orientation> of
+        piece <piece_index>.
+        """
+        return self._orientation_rows[(piece_index, orientation)]
 
     def get_num_pieces(self):
         """
@@ -195,4 +291,5 @@ class PieceList(object):
     def copy(self):
         cpy_p_list = PieceList(None)
         cpy_p_list.pieces = [piece.copy() for piece in self.pieces]
+        cpy_p_list._set_tables(orientation_tables(cpy_p_list.pieces))
         return cpy_p_list
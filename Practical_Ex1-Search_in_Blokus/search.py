@@ -2,16 +2,42 @@
 In search.py, you will implement generic search algorithms
 """
 
+import heapq
+import itertools
+
 import util
 
 
 class Node:
+    """
+    A search tree node. Nodes only point to their parent, so pushing a node
+    costs O(1) whatever its depth; the action path is rebuilt by get_path
+    once, when a goal is found.
+
+    For lazy problems, state stays None until the node is popped and is then
+    built from the parent's state and the node's action.
+    """
 
-    def __init__(self, state, path_to_node, path_cost):
+    __slots__ = ('state', 'parent', 'action', 'path_cost')
+
+    def __init__(self, state, parent=None, action=None, path_cost=0):
         self.state = state
-        self.path_to_node = path_to_node
+        self.parent = parent
+        self.action = action
         self.path_cost = path_cost
 
+    def get_path(self):
+        """
+        Returns the list of actions leading from the root to this node
+        """
+        path = []
+        node = self
+        while node.parent is not None:
+            path.append(node.action)
+            node = node.parent
+        path.reverse()
+        return path
+
 
 class SearchProblem:
     """
@@ -19,8 +45,19 @@ class SearchProblem:
     any of the methods (in object-oriented terminology: an abstract class).
 
     You do not need to change anything in this class, ever.
+
+    Problems whose successor states are expensive to build can set
+    lazy_successors to True and implement get_successor_actions and
+    get_successor instead: the search algorithms then only build a successor
+    state once its node is popped from the fringe.
+
+    Problems with a single goal state whose predecessors can be generated
+    can implement get_goal_state and get_predecessors too, and be solved by
+    the bidirectional searches.
     """
 
+    lazy_successors = False
+
     def get_start_state(self):
         """
         Returns the start state for the search problem
@@ -47,6 +84,26 @@ class SearchProblem:
         """
         util.raiseNotDefined()
 
+    def get_successor_actions(self, state):
+        """
+        state: Search state
+
+        For problems with lazy_successors, returns a list of pairs
+        (action, stepCost) for the successors of 'state', without building
+        the successor states themselves
+        """
+        util.raiseNotDefined()
+
+    def get_successor(self, state, action):
+        """
+        state: Search state
+        action: One of the actions returned by get_successor_actions(state)
+
+        For problems with lazy_successors, returns the state reached by
+        taking 'action' in 'state'
+        """
+        util.raiseNotDefined()
+
     def get_cost_of_actions(self, actions) -> int:
         """
         actions: A list of actions to take
@@ -56,6 +113,60 @@ class SearchProblem:
         """
         util.raiseNotDefined()
 
+    def get_goal_state(self):
+        """
+        For problems solved by the bidirectional searches, returns the only
+        goal state
+        """
+        util.raiseNotDefined()
+
+    def get_predecessors(self, state):
+        """
+        state: Search state
+
+        For problems solved by the bidirectional searches, returns a list of
+        triples, (predecessor, action, stepCost), where taking 'action' in
+        'predecessor' leads to 'state' at a cost of 'stepCost'
+        """
+        util.raiseNotDefined()
+
+
+def _children(problem, node):
+    """
+    Returns the child Nodes of <node>. Children of lazy problems are returned
+    without a state; _materialize builds it when the child is popped.
+    """
+    if getattr(problem, 'lazy_successors', False):
+        return [Node(None, node, child_move, node.path_cost + child_cost)
+                for child_move, child_cost in problem.get_successor_actions(node.state)]
+
+    return [Node(child_state, node, child_move, node.path_cost + child_cost)
+            for child_state, child_move, child_cost in problem.get_successors(node.state)]
+
+
+def _successor_triples(problem, state, indices=None):
+    """
+    Returns get_successors(state) as (index, successor, action, stepCost)
+    quadruples, only for the successors whose index is in <indices> if given.
+    Only the returned successors of lazy problems are built.
+    """
+    if getattr(problem, 'lazy_successors', False):
+        return [(index, problem.get_successor(state, child_move), child_move, child_cost)
+                for index, (child_move, child_cost) in enumerate(problem.get_successor_actions(state))
+                if indices is None or index in indices]
+    return [(index, child_state, child_move, child_cost)
+            for index, (child_state, child_move, child_cost) in enumerate(problem.get_successors(state))
+            if indices is None or index in indices]
+
+
+def _materialize(problem, node):
+    """
+    Makes sure <node> has its state, and returns it
+    """
+    if node.state is None:
+        node.state = problem.get_successor(node.parent.state, node.action)
+    return node
+
 
 def depth_first_search(problem: SearchProblem):
     """
@@ -73,21 +184,17 @@ def depth_first_search(problem: SearchProblem):
     """
     "*** YOUR CODE HERE ***"
     fringe = util.Stack()
-    init_node = Node(problem.get_start_state(), [], 0)
+    init_node = Node(problem.get_start_state())
     fringe.push(init_node)
     visited = set()
 
     while not fringe.isEmpty():
-        current_node = fringe.pop()
+        current_node = _materialize(problem, fringe.pop())
         if problem.is_goal_state(current_node.state):
-            return current_node.path_to_node
+            return current_node.get_path()
 
         if current_node.state not in visited:
-            successors = problem.get_successors(current_node.state)
-            for child_triple in successors:
-                child_state, child_move, child_cost = child_triple
-                child_node = Node(child_state, current_node.path_to_node + [child_move],
-                                  current_node.path_cost + child_cost)
+            for child_node in _children(problem, current_node):
                 fringe.push(child_node)
             visited.add(current_node.state)
 
@@ -100,52 +207,176 @@ def breadth_first_search(problem: SearchProblem):
     """
     "*** YOUR CODE HERE ***"
     fringe = util.Queue()
-    init_node = Node(problem.get_start_state(), [], 0)
+    init_node = Node(problem.get_start_state())
     fringe.push(init_node)
     visited = set()
 
     while not fringe.isEmpty():
-        current_node = fringe.pop()
+        current_node = _materialize(problem, fringe.pop())
         if problem.is_goal_state(current_node.state):
-            return current_node.path_to_node
+            return current_node.get_path()
 
         if current_node.state not in visited:
-            successors = problem.get_successors(current_node.state)
-            for child_triple in successors:
-                child_state, child_move, child_cost = child_triple
-                child_node = Node(child_state, current_node.path_to_node + [child_move],
-                                  current_node.path_cost + child_cost)
-                fringe.push(child_node)
             visited.add(current_node.state)
+            for child_node in _children(problem, current_node):
+                if child_node.state not in visited:  # always pushed if lazy: its state is still None
+                    fringe.push(child_node)
 
     return []  # if root has no children
 
 
-def uniform_cost_search(problem: SearchProblem):
+class SearchStats:
+    """
+    Counters filled in by uniform_cost_search and a_star_search when passed
+    as their 'stats' argument:
+    - expanded: states whose successors were generated
+    - pushes: nodes pushed into the fringe
+    - dominated: children not pushed because a path at most as cheap to
+      their state was already known
+    - stale_pops: popped nodes skipped because a cheaper path to their state
+      had been found since they were pushed
+    - re_expansions: states expanded again because a cheaper path to them was
+      found after their first expansion (only with inconsistent heuristics)
+    - max_fringe: the largest number of nodes held in the fringe
+    - forgotten: nodes memory_bounded_a_star_search dropped from its fringe
+      to stay within its node budget
+
+    iterative_deepening_a_star_search, memory_bounded_a_star_search and
+    bidirectional_uniform_cost_search fill in the counters that apply to
+    them.
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.pushes = 0
+        self.dominated = 0
+        self.stale_pops = 0
+        self.re_expansions = 0
+        self.max_fringe = 0
+        self.forgotten = 0
+
+    def __str__(self):
+        return "expanded: %d, pushes: %d, dominated: %d, stale pops: %d, re-expansions: %d, max fringe: %d, " \
+               "forgotten: %d" % (self.expanded, self.pushes, self.dominated, self.stale_pops, self.re_expansions,
+                                  self.max_fringe, self.forgotten)
+
+
+def uniform_cost_search(problem: SearchProblem, stats=None):
     """
     Search the node of least total cost first.
     """
     "*** YOUR CODE HERE ***"
-    fringe = util.PriorityQueue()
-    init_node = Node(problem.get_start_state(), [], 0)
-    fringe.push(init_node, 0)
-    visited = set()
+    return _best_first_search(problem, null_heuristic, stats)
 
-    while not fringe.isEmpty():
-        current_node = fringe.pop()
-        if problem.is_goal_state(current_node.state):
-            return current_node.path_to_node
 
-        if current_node.state not in visited:
-            successors = problem.get_successors(current_node.state)
-            for child_triple in successors:
-                child_state, child_move, child_cost = child_triple
-                child_node = Node(child_state, current_node.path_to_node + [child_move],
-                                  current_node.path_cost + child_cost)
-                fringe.push(child_node, child_node.path_cost)
-            visited.add(current_node.state)
+def _stitch(forward_node, backward_node):
+    """
+    Returns the actions from the start to the goal through the state of
+    <forward_node> (reached from the start) and <backward_node> (reached
+    backwards from the goal)
+    """
+    path = forward_node.get_path()
+    node = backward_node
+    while node.parent is not None:
+        path.append(node.action)
+        node = node.parent
+    return path
 
-    return []  # if root has no children
+
+def bidirectional_breadth_first_search(problem: SearchProblem):
+    """
+    Search the shallowest nodes from the start and, backwards through
+    get_predecessors, from the goal state at once. Every round expands a
+    whole layer of the side whose layer is smaller, until some state is
+    reached by both; the shortest path through such a state is returned.
+    Each side only goes about half way, so with b successors per state about
+    2 * b ** (d / 2) states are expanded instead of b ** d.
+    """
+    start, goal = Node(problem.get_start_state()), Node(problem.get_goal_state())
+    if start.state == goal.state:
+        return []
+    reached = ({start.state: start}, {goal.state: goal})  # forward, backward
+    layers = [[start], [goal]]
+
+    while layers[0] and layers[1]:
+        side = 0 if len(layers[0]) <= len(layers[1]) else 1
+        expand = problem.get_successors if side == 0 else problem.get_predecessors
+        meeting = None
+        next_layer = []
+        for node in layers[side]:
+            for child_state, child_move, _ in expand(node.state):
+                if child_state in reached[side]:
+                    continue
+                child_node = Node(child_state, node, child_move, node.path_cost + 1)
+                reached[side][child_state] = child_node
+                next_layer.append(child_node)
+                other_node = reached[1 - side].get(child_state)
+                if other_node is not None and \
+                        (meeting is None or child_node.path_cost + other_node.path_cost < meeting[0]):
+                    meeting = (child_node.path_cost + other_node.path_cost, child_node, other_node)
+        if meeting is not None:
+            _, child_node, other_node = meeting
+            return _stitch(child_node, other_node) if side == 0 else _stitch(other_node, child_node)
+        layers[side] = next_layer
+
+    return []  # the goal can't be reached
+
+
+def bidirectional_uniform_cost_search(problem: SearchProblem, stats=None):
+    """
+    Search the node of least total cost from the start and, backwards
+    through get_predecessors, from the goal state at once, expanding the
+    side with the smaller fringe each time. Every state reached by both
+    sides gives a path; the search stops once the two fringe tops cost at
+    least the cheapest of them together, as no cheaper path is left.
+    Children that can't lead to a cheaper path are not pushed: those the
+    other side has expanded, and those whose cost plus the other side's
+    fringe top is already no cheaper.
+    """
+    if stats is None:
+        stats = SearchStats()
+    start, goal = Node(problem.get_start_state()), Node(problem.get_goal_state())
+    if start.state == goal.state:
+        return []
+    best = ({start.state: start}, {goal.state: goal})  # the cheapest known node of every state, per side
+    closed = (set(), set())
+    fringes = (util.PriorityQueue(), util.PriorityQueue())
+    fringes[0].push(start, 0)
+    fringes[1].push(goal, 0)
+    stats.pushes += 2
+    meeting = None  # (cost, forward node, backward node) of the cheapest path found
+
+    while not fringes[0].isEmpty() and not fringes[1].isEmpty():
+        stats.max_fringe = max(stats.max_fringe, len(fringes[0]) + len(fringes[1]))
+        tops = (fringes[0].heap[0][0], fringes[1].heap[0][0])
+        if meeting is not None and tops[0] + tops[1] >= meeting[0]:
+            break
+        side = 0 if len(fringes[0]) <= len(fringes[1]) else 1
+        node = fringes[side].pop()
+        if node.state in closed[side] or best[side][node.state] is not node:
+            stats.stale_pops += 1
+            continue
+        closed[side].add(node.state)
+        stats.expanded += 1
+
+        expand = problem.get_successors if side == 0 else problem.get_predecessors
+        for child_state, child_move, child_cost in expand(node.state):
+            child_g = node.path_cost + child_cost
+            if child_state in best[side] and best[side][child_state].path_cost <= child_g:
+                stats.dominated += 1
+                continue
+            child_node = Node(child_state, node, child_move, child_g)
+            best[side][child_state] = child_node
+            other_node = best[1 - side].get(child_state)
+            if other_node is not None and (meeting is None or child_g + other_node.path_cost < meeting[0]):
+                meeting = (child_g + other_node.path_cost,) + \
+                          ((child_node, other_node) if side == 0 else (other_node, child_node))
+            if child_state in closed[1 - side] or (meeting is not None and child_g + tops[1 - side] >= meeting[0]):
+                continue  # no path through it beats the meeting: its cost to the goal is known or at least a top
+            fringes[side].push(child_node, child_g)
+            stats.pushes += 1
+
+    return [] if meeting is None else _stitch(meeting[1], meeting[2])
 
 
 def null_heuristic(state, problem=None):
@@ -156,34 +387,337 @@ def null_heuristic(state, problem=None):
     return 0
 
 
-def a_star_search(problem: SearchProblem, heuristic=null_heuristic):
+def a_star_search(problem: SearchProblem, heuristic=null_heuristic, stats=None):
     """
     Search the node that has the lowest combined cost and heuristic first.
     """
     "*** YOUR CODE HERE ***"
+    return _best_first_search(problem, heuristic, stats)
+
+
+def _best_first_search(problem, heuristic, stats):
+    """
+    A* (uniform cost search for null_heuristic) with a best-g table.
+
+    best_g holds the cheapest known path cost of every state seen so far.
+    A child is only pushed if it improves on it; the nodes it supersedes
+    stay in the heap and are dropped when popped (lazy deletion). closed
+    holds the path cost each state was expanded with, so a state is only
+    expanded again if a strictly cheaper path to it turns up.
+
+    The children of lazy problems stay unbuilt in the fringe, and are only
+    checked against best_g once popped. With a heuristic, an unbuilt child
+    is pushed with its parent's f (or its own g, if higher), a lower bound of
+    its f for consistent heuristics (pathmax). When it is popped, it is built
+    and scored, and pushed back with its real f if that is higher.
+    """
+    if stats is None:
+        stats = SearchStats()
+    use_heuristic = heuristic is not null_heuristic
+
     fringe = util.PriorityQueue()
-    init_node = Node(problem.get_start_state(), [], 0)
-    fringe.push(init_node, 0)
-    visited = set()
+    init_node = Node(problem.get_start_state())
+    best_g = {init_node.state: 0}
+    closed = {}
+    fringe.push(init_node, heuristic(init_node.state, problem) if use_heuristic else 0)
+    stats.pushes += 1
 
     while not fringe.isEmpty():
+        stats.max_fringe = max(stats.max_fringe, len(fringe))
+        f = fringe.heap[0][0]
         current_node = fringe.pop()
-        if problem.is_goal_state(current_node.state):
-            return current_node.path_to_node
-
-        if current_node.state not in visited:
-            successors = problem.get_successors(current_node.state)
-            for child_triple in successors:
-                child_state, child_move, child_cost = child_triple
-                child_node = Node(child_state, current_node.path_to_node + [child_move],
-                                  current_node.path_cost + child_cost)
-                fringe.push(child_node, child_node.path_cost + heuristic(child_node.state, problem))
-            visited.add(current_node.state)
+        scored = current_node.state is not None
+        _materialize(problem, current_node)
+        state, g = current_node.state, current_node.path_cost
+        if g > best_g.get(state, g) or closed.get(state, float('inf')) <= g:
+            stats.stale_pops += 1
+            continue
+
+        if use_heuristic and not scored:
+            if best_g.get(state, float('inf')) <= g:
+                stats.dominated += 1
+                continue
+            best_g[state] = g
+            child_f = g + heuristic(state, problem)
+            if child_f > f:
+                fringe.push(current_node, child_f)
+                stats.pushes += 1
+                continue
+
+        if problem.is_goal_state(state):
+            return current_node.get_path()
+
+        if state in closed:
+            stats.re_expansions += 1
+        closed[state] = g
+        best_g[state] = g
+        stats.expanded += 1
+
+        for child_node in _children(problem, current_node):
+            child_g = child_node.path_cost
+            if child_node.state is None:
+                fringe.push(child_node, max(child_g, f) if use_heuristic else child_g)
+                stats.pushes += 1
+                continue
+            if best_g.get(child_node.state, float('inf')) <= child_g:
+                stats.dominated += 1
+                continue
+            best_g[child_node.state] = child_g
+
+            h = heuristic(child_node.state, problem) if use_heuristic else 0
+            fringe.push(child_node, child_g + h)
+            stats.pushes += 1
 
     return []  # if root has no children
 
+
+def iterative_deepening_a_star_search(problem: SearchProblem, heuristic=null_heuristic, stats=None):
+    """
+    IDA*: a series of depth first searches, each cut off at the smallest
+    f = g + h that exceeded the bound of the previous one. Memory grows with
+    the depth of the solution only, at the price of expanding the top of the
+    tree again on every iteration. States are only checked for repetition
+    along the current path.
+    """
+    if stats is None:
+        stats = SearchStats()
+
+    root = Node(problem.get_start_state())
+    bound = heuristic(root.state, problem)
+    while bound != float('inf'):
+        goal_node, bound = _bounded_depth_first_search(problem, heuristic, root, bound, stats)
+        if goal_node is not None:
+            return goal_node.get_path()
+
+    return []  # no solution
+
+
+def _bounded_depth_first_search(problem, heuristic, root, bound, stats):
+    """
+    One IDA* iteration. Returns (goal_node, bound) if a goal with f <= bound
+    was found, or (None, smallest f seen beyond bound) otherwise
+    """
+    next_bound = float('inf')
+    on_path = {root.state}
+    stack = [(root, None)]  # (node, iterator over its children)
+
+    while stack:
+        node, children = stack[-1]
+        if children is None:
+            f = node.path_cost + heuristic(node.state, problem)
+            if f > bound:
+                next_bound = min(next_bound, f)
+                stack.pop()
+                on_path.discard(node.state)
+                continue
+            if problem.is_goal_state(node.state):
+                return node, bound
+
+            stats.expanded += 1
+            children = iter(_children(problem, node))
+            stack[-1] = (node, children)
+
+        child_node = next(children, None)
+        if child_node is None:
+            stack.pop()
+            on_path.discard(node.state)
+            continue
+        _materialize(problem, child_node)
+        if child_node.state in on_path:
+            continue
+        on_path.add(child_node.state)
+        stack.append((child_node, None))
+        stats.pushes += 1
+        stats.max_fringe = max(stats.max_fringe, len(stack))
+
+    return None, next_bound
+
+
+class _BoundedNode(Node):
+    """
+    A Node with the bookkeeping memory_bounded_a_star_search needs:
+    - f: the node's f value; once its children are forgotten, the lowest f
+      among them
+    - depth: the number of actions from the root
+    - index: the node's position in its parent's successor list
+    - entry: the id of the node's current fringe entry (None if not in it)
+    - expanded: whether the node's successors were generated
+    - live_children: the children neither forgotten nor found to be dead ends
+    - forgotten: the indices of the forgotten children, regenerated when the
+      node is popped again
+    """
+
+    __slots__ = ('f', 'depth', 'index', 'entry', 'expanded', 'live_children', 'forgotten')
+
+    def __init__(self, state, parent=None, action=None, path_cost=0, index=None):
+        Node.__init__(self, state, parent, action, path_cost)
+        self.f = 0
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.index = index
+        self.entry = None
+        self.expanded = False
+        self.live_children = 0
+        self.forgotten = set()
+
+
+def memory_bounded_a_star_search(problem: SearchProblem, heuristic=null_heuristic, max_nodes=100000,
+                                 stats=None):
+    """
+    An SMA*-style A* that holds no more than <max_nodes> nodes between
+    expansions, counting the leaves of its fringe and all their ancestors.
+
+    When the budget is exceeded, the leaf with the highest f (the shallowest
+    one among ties) is forgotten: it is removed from the fringe, and its
+    parent goes back into the fringe with the lowest f of its forgotten
+    children. If the parent is popped again, only the forgotten children are
+    generated again. Paths of more than max_nodes - 1 actions don't fit, so
+    nodes that deep are never generated. f never decreases along a path
+    (pathmax), and states are only checked for repetition along a node's own
+    path. Entries of nodes that left the fringe or were pushed again are
+    dropped from the heaps once they outnumber the live ones.
+
+    The solution is optimal if the budget can hold the optimal path and
+    its siblings; otherwise this returns the best solution it can find, or
+    [] if none fits.
+    """
+    if max_nodes < 1:
+        raise ValueError("max_nodes must be at least 1")
+    if stats is None:
+        stats = SearchStats()
+
+    inf = float('inf')
+    entries = itertools.count()
+    best_first = []  # (f, -depth, entry, node): deepest first among ties
+    worst_first = []  # (-f, depth, entry, node): shallowest first among ties
+    fringe_size = 0
+    stored = 0  # the nodes of the search tree: the fringe and the ancestors of its nodes
+
+    def compact(heap):
+        # Drop the entries of nodes that left the fringe or were pushed again
+        if len(heap) > 2 * fringe_size + 16:
+            heap[:] = [item for item in heap if item[3].entry == item[2]]
+            heapq.heapify(heap)
+
+    def push(node):
+        # Pushing a node already in the fringe replaces its old entry
+        nonlocal fringe_size
+        if node.entry is None:
+            fringe_size += 1
+        node.entry = next(entries)
+        heapq.heappush(best_first, (node.f, -node.depth, node.entry, node))
+        heapq.heappush(worst_first, (-node.f, node.depth, node.entry, node))
+        stats.pushes += 1
+        compact(best_first)
+        compact(worst_first)
+
+    def pop_best():
+        nonlocal fringe_size
+        while True:
+            entry, node = heapq.heappop(best_first)[2:]
+            if node.entry == entry:
+                node.entry = None
+                fringe_size -= 1
+                return node
+
+    def pop_worst_leaf():
+        # Parents waiting to regenerate children while others are still alive
+        # are not leaves; their entries are put back
+        nonlocal fringe_size
+        skipped = []
+        while True:
+            item = heapq.heappop(worst_first)
+            entry, node = item[2:]
+            if node.entry != entry:
+                continue
+            if node.live_children > 0 or node.parent is None:
+                skipped.append(item)
+                continue
+            for item in skipped:
+                heapq.heappush(worst_first, item)
+            node.entry = None
+            fringe_size -= 1
+            return node
+
+    def forget(node, f):
+        # Remove <node> (a leaf with value <f>, inf for a dead end) from its
+        # parent's live children. The parent goes back into the fringe to
+        # regenerate it; a parent with only dead ends is a dead end too.
+        nonlocal stored
+        parent = node.parent
+        while parent is not None:
+            stored -= 1
+            parent.live_children -= 1
+            if f < inf:
+                parent.forgotten.add(node.index)
+                if parent.entry is None or f < parent.f:
+                    parent.f = f
+                    push(parent)
+                return
+            if parent.live_children > 0 or parent.forgotten:
+                return
+            node, parent = parent, parent.parent
+
+    root = _BoundedNode(problem.get_start_state())
+    root.f = heuristic(root.state, problem)
+    if root.f < inf:
+        push(root)
+        stored = 1
+
+    while fringe_size:
+        current_node = pop_best()
+        if problem.is_goal_state(current_node.state):
+            return current_node.get_path()
+
+        if current_node.expanded:
+            stats.re_expansions += 1
+            indices = current_node.forgotten
+        else:
+            stats.expanded += 1
+            indices = None
+        current_node.expanded = True
+        current_node.forgotten = set()
+
+        on_path = set()
+        ancestor = current_node
+        while ancestor is not None:
+            on_path.add(ancestor.state)
+            ancestor = ancestor.parent
+
+        children = []
+        if current_node.depth + 1 < max_nodes:  # else the path to a child would not fit in the budget
+            for index, child_state, child_move, child_cost in _successor_triples(problem, current_node.state,
+                                                                                 indices):
+                if child_state in on_path:
+                    continue
+                child_node = _BoundedNode(child_state, current_node, child_move,
+                                          current_node.path_cost + child_cost, index)
+                child_node.f = max(current_node.f, child_node.path_cost + heuristic(child_state, problem))
+                if child_node.f < inf:
+                    children.append(child_node)
+
+        current_node.live_children += len(children)
+        stored += len(children)
+        for child_node in children:
+            push(child_node)
+        if current_node.live_children == 0:
+            forget(current_node, inf)
+
+        # A single path of at most max_nodes nodes is always left, so the fringe never runs out of leaves here
+        while stored > max_nodes:
+            worst_node = pop_worst_leaf()
+            stats.forgotten += 1
+            forget(worst_node, worst_node.f)
+        stats.max_fringe = max(stats.max_fringe, fringe_size)
+
+    return []  # no solution within the budget
+
+
 # Abbreviations
 bfs = breadth_first_search
 dfs = depth_first_search
 astar = a_star_search
 ucs = uniform_cost_search
+idastar = iterative_deepening_a_star_search
+smastar = memory_bounded_a_star_search
+bibfs = bidirectional_breadth_first_search
+biucs = bidirectional_uniform_cost_search
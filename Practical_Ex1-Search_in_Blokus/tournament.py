@@ -0,0 +1,163 @@
+"""
+Plays many headless Blokus games between Input agents, in parallel, and
+reports their scores and the simulation speed.
+
+USAGE:      python tournament.py [-a <agent>]... [-n <games>] [-j <processes>] [-r <seed>] [-b <backend>]
+                                 [-o <results file>]
+EXAMPLE:    python tournament.py -a RandomInput -a RandomInput -n 1000 -j 4
+
+An agent is the name of an Input class, from inputs.py or as module.Class,
+optionally followed by constructor arguments: RandomInput or
+inputs.RandomInput:arg=1,other='a'. Two to four agents play each game
+(four RandomInputs by default), and the seats rotate from one game to the
+next so every agent plays every corner. Game <k> is seeded with seed + k,
+so a tournament can be replayed.
+"""
+
+import ast
+import importlib
+import json
+import multiprocessing
+import random
+import time
+from optparse import OptionParser
+
+import numpy as np
+
+
+def create_agent(spec):
+    """
+    Returns a new Input described by <spec> (see the module docstring)
+    """
+    name, _, arg_str = spec.partition(':')
+    module_name, _, class_name = name.rpartition('.')
+    module = importlib.import_module(module_name or 'inputs')
+    kwargs = {}
+    for arg in arg_str.split(',') if arg_str else []:
+        key, _, value = arg.partition('=')
+        kwargs[key.strip()] = ast.literal_eval(value.strip())
+    return getattr(module, class_name)(**kwargs)
+
+
+def play_game(game_index, agents, size, pieces_file, seed, backend='bitboard'):
+    """
+    Plays game <game_index> between <agents> on boards of <backend> (see
+    board.set_board_backend) and returns its result: per agent (in the order
+    of <agents>) its seat, score and the turn it passed on, and the number of
+    moves and seconds the game took
+    """
+    from board import set_board_backend
+    from game import GameEngine
+    from pieces import PieceList
+
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    set_board_backend(backend)
+    piece_list = PieceList(pieces_file)
+
+    shift = game_index % len(agents)
+    seats = [(seat + shift) % len(agents) for seat in range(len(agents))]  # the agent in each seat
+    inputs = [create_agent(agents[agent]) for agent in seats]
+    engine = GameEngine(inputs, size[1], size[0], piece_list, graphics='none')
+
+    start_time = time.perf_counter()
+    try:
+        while not engine.all_players_passed():
+            engine.play_turn()
+    finally:
+        engine.close()
+    game_time = time.perf_counter() - start_time
+
+    results = [None] * len(agents)
+    for seat, agent in enumerate(seats):
+        results[agent] = {'seat': seat, 'score': engine.score[seat], 'pass_turn': engine.pass_turns[seat]}
+        if hasattr(inputs[seat], 'iterations_per_second'):
+            results[agent]['iterations_per_second'] = inputs[seat].iterations_per_second()
+    return {'game': game_index, 'seed': seed, 'agents': results,
+            'moves': int(np.count_nonzero(~engine.board.pieces)), 'time': game_time}
+
+
+def _play_game_job(args):
+    return play_game(*args)
+
+
+def run_tournament(agents, num_games, processes=1, size=(20, 20), pieces_file='valid_pieces.txt', seed=0,
+                   backend='bitboard'):
+    """
+    Plays <num_games> games between <agents> with up to <processes> games at
+    a time, and returns their results in game order
+    """
+    jobs = [(game_index, agents, size, pieces_file, seed + game_index, backend) for game_index in range(num_games)]
+    if processes == 1:
+        return [_play_game_job(job) for job in jobs]
+    with multiprocessing.Pool(processes) as pool:
+        return sorted(pool.imap_unordered(_play_game_job, jobs), key=lambda game: game['game'])
+
+
+def summarize(agents, games, wall_time):
+    """
+    Returns the aggregate statistics of <games>: per agent its mean score,
+    wins (shared between the agents tied for the best score) and mean pass
+    turn, and the games and moves simulated per second
+    """
+    summary = {'agents': [], 'games': len(games), 'wall_time': wall_time,
+               'games_per_second': len(games) / wall_time,
+               'moves_per_second': sum(game['moves'] for game in games) / sum(game['time'] for game in games)}
+    best_scores = [max(result['score'] for result in game['agents']) for game in games]
+    for agent, spec in enumerate(agents):
+        results = [game['agents'][agent] for game in games]
+        wins = sum(1 / [result['score'] for result in game['agents']].count(best)
+                   for game, best in zip(games, best_scores) if game['agents'][agent]['score'] == best)
+        summary['agents'].append({'agent': spec,
+                                  'mean_score': float(np.mean([result['score'] for result in results])),
+                                  'wins': wins,
+                                  'mean_pass_turn': float(np.mean([result['pass_turn'] for result in results]))})
+        if 'iterations_per_second' in results[0]:
+            summary['agents'][-1]['iterations_per_second'] = float(
+                np.mean([result['iterations_per_second'] for result in results]))
+    return summary
+
+
+def main():
+    from board import BOARD_BACKENDS
+
+    parser = OptionParser(__doc__.split('\n\n')[1])
+    parser.add_option('-a', '--agent', dest='agents', action='append', metavar='AGENT',
+                      help='an agent playing the games; give two to four', default=None)
+    parser.add_option('-n', '--games', dest='num_games', type='int', help='the number of games', default=100)
+    parser.add_option('-j', '--processes', dest='processes', type='int',
+                      help='the number of games to play at a time', default=multiprocessing.cpu_count())
+    parser.add_option('-r', '--seed', dest='seed', type='int', help='the seed of the first game', default=0)
+    parser.add_option('-s', '--board-size', dest='size', type='int', nargs=2,
+                      help='the size of the game board', default=(20, 20))
+    parser.add_option('-p', '--pieces', dest='pieces_file', help='the file to read for the list of pieces',
+                      default='valid_pieces.txt')
+    parser.add_option('-b', '--board-backend', dest='board_backend', type='choice',
+                      help='board representation: NumPy arrays or integer bitboards',
+                      choices=list(BOARD_BACKENDS), default='bitboard')
+    parser.add_option('-o', '--output', dest='output', metavar='FILE',
+                      help='the JSON file to write every game and the summary to', default=None)
+
+    options, _ = parser.parse_args()
+    agents = options.agents or ['RandomInput'] * 4
+    if not 2 <= len(agents) <= 4:
+        parser.error('a game needs two to four agents')
+
+    start_time = time.perf_counter()
+    games = run_tournament(agents, options.num_games, options.processes, options.size, options.pieces_file,
+                           options.seed, options.board_backend)
+    summary = summarize(agents, games, time.perf_counter() - start_time)
+
+    for agent in summary['agents']:
+        print("%-30s mean score: %.2f, wins: %.1f, mean pass turn: %.2f%s" %
+              (agent['agent'], agent['mean_score'], agent['wins'], agent['mean_pass_turn'],
+               ", %.0f iterations/s" % agent['iterations_per_second'] if 'iterations_per_second' in agent else ''))
+    print("%d games in %.2f seconds: %.1f games/s, %.0f moves/s per process" %
+          (summary['games'], summary['wall_time'], summary['games_per_second'], summary['moves_per_second']))
+    if options.output is not None:
+        with open(options.output, 'w') as f:
+            json.dump({'summary': summary, 'games': games}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
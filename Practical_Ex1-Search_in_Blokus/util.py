@@ -9,6 +9,8 @@
 import sys
 import inspect
 import heapq, random
+import itertools
+import collections
 
 """
  Data structures useful for implementing SearchAgents
@@ -38,11 +40,11 @@ class Queue:
     "A container with a first-in-first-out (FIFO) queuing policy."
 
     def __init__(self):
-        self.list = []
+        self.list = collections.deque()
 
     def push(self, item):
         "Enqueue the 'item' into the queue"
-        self.list.insert(0, item)
+        self.list.appendleft(item)
 
     def pop(self):
         """
@@ -66,29 +68,29 @@ class PriorityQueue:
       Note that this PriorityQueue does not allow you to change the priority
       of an item.  However, you may insert the same item multiple times with
       different priorities.
+
+      Items of equal priority are popped newest first (a depth-first tie
+      break that suits A*), and items never need to be comparable.
     """
 
     def __init__(self):
         self.heap = []
-        self.init = False
+        self.count = itertools.count()
 
     def push(self, item, priority):
-        if not self.init:
-            self.init = True
-            try:
-                item < item
-            except:
-                item.__class__.__lt__ = lambda x, y: (True)
-        pair = (priority, item)
-        heapq.heappush(self.heap, pair)
+        entry = (priority, -next(self.count), item)
+        heapq.heappush(self.heap, entry)
 
     def pop(self):
-        (priority, item) = heapq.heappop(self.heap)
+        (priority, _, item) = heapq.heappop(self.heap)
         return item
 
     def isEmpty(self):
         return len(self.heap) == 0
 
+    def __len__(self):
+        return len(self.heap)
+
 
 class PriorityQueueWithFunction(PriorityQueue):
     """
@@ -6,6 +6,7 @@ from game import Game, RandomOpponentAgent
 from game_state import GameState
 from graphics_display import GabrieleCirulli2048GraphicsDisplay
 from keyboard_agent import KeyboardAgent
+from transposition_table import DEFAULT_TABLE_SIZE
 
 NUM_OF_INITIAL_TILES = 2
 
@@ -48,8 +49,10 @@ def create_agent(args):
         from multi_agents import ReflexAgent
         agent = ReflexAgent()
     else:
-        agent = util.lookup('multi_agents.' + args.agent, globals())(depth=args.depth,
-                                                                     evaluation_function=args.evaluation_function)
+        agent = util.lookup('multi_agents.' + args.agent, globals())(
+            depth=args.depth, evaluation_function=args.evaluation_function,
+            transposition_table_size=args.transposition_table_size,
+            persist_transposition_table=args.persist_transposition_table, time_budget=args.time_budget)
     return agent
 
 
@@ -68,6 +71,13 @@ def main():
     parser.add_argument('--initial_board', help='Initial board for new games.', default=None, type=str)
     parser.add_argument('--evaluation_function', help='The evaluation function for ai agent.',
                         default='score_evaluation_function', type=str)
+    parser.add_argument('--transposition_table_size', help='The number of entries of the transposition table of the '
+                                                           'AlphaBetaAgent and ExpectimaxAgent, 0 for none.',
+                        default=DEFAULT_TABLE_SIZE, type=int)
+    parser.add_argument('--persist_transposition_table', help='Keep the transposition table from one move to the next.',
+                        action='store_true')
+    parser.add_argument('--time_budget', help='Seconds to search each move for, deepening the search from depth 1 '
+                                              'instead of searching to --depth.', default=None, type=float)
     args = parser.parse_args()
     numpy.random.seed(args.random_seed)
     if args.display != displays[0]:
@@ -93,6 +103,11 @@ def main():
             num_of_games_above += 1
     if display is not None:
         display.print_stats()
+    if getattr(agent, 'transposition_table', None) is not None and agent.transposition_table.lookups:
+        print(agent.transposition_table)
+    if getattr(agent, 'completed_depths', None):
+        print('mean search depth: %.2f, min: %d, max: %d' % (numpy.mean(agent.completed_depths),
+                                                             min(agent.completed_depths), max(agent.completed_depths)))
     print('num of games above 7000: ', num_of_games_above)
 if __name__ == '__main__':
     main()
@@ -0,0 +1,252 @@
+"""
+A 2048 game state packed into a single 64-bit integer, for search agents
+that generate many successors per move.
+
+Every tile is kept as the exponent of its value (0 for an empty tile, 1 for
+2, ..., 15 for 32768) in 4 bits: the tile in row r and column c is nibble
+4 * r + c. Moving a row left or right is a lookup of its 16 bits in a
+precomputed table, which also holds the score the move adds; up and down
+moves transpose the board, move its rows and transpose it back.
+BitboardGameState has the interface of GameState (game_state.py), so agents
+and evaluation functions use either one.
+"""
+
+import numpy as np
+
+from game import Action, OpponentAction
+from game_state import DEFAULT_BOARD_SIZE
+
+MAX_EXPONENT = 15  # two 32768 tiles don't fuse, 65536 wouldn't fit in 4 bits
+ROW_MASK = 0xFFFF
+ONES = 0x1111111111111111
+HIGH_BITS = 0x8888888888888888
+AGENT_ACTIONS = (Action.RIGHT, Action.LEFT, Action.UP, Action.DOWN)  # in the order of GameState
+
+
+def _reverse_row(row):
+    return ((row & 0xF) << 12) | ((row & 0xF0) << 4) | ((row >> 4) & 0xF0) | (row >> 12)
+
+
+def _build_row_tables():
+    """
+    Returns the rows after a left move and after a right move, and the scores
+    of both moves, for each of the 65536 rows
+    """
+    row_left, score_left = [0] * (ROW_MASK + 1), [0] * (ROW_MASK + 1)
+    for row in range(ROW_MASK + 1):
+        tiles = [(row >> 4 * col) & 0xF for col in range(DEFAULT_BOARD_SIZE)]
+        tiles = [tile for tile in tiles if tile != 0]
+        fused = []
+        score = 0
+        while tiles:
+            tile = tiles.pop(0)
+            if tiles and tiles[0] == tile and tile != MAX_EXPONENT:
+                tiles.pop(0)
+                tile += 1
+                score += 1 << tile
+            fused.append(tile)
+        row_left[row] = sum(tile << 4 * col for col, tile in enumerate(fused))
+        score_left[row] = score
+    row_right, score_right = [0] * (ROW_MASK + 1), [0] * (ROW_MASK + 1)
+    for row in range(ROW_MASK + 1):
+        reversed_row = _reverse_row(row)
+        row_right[row] = _reverse_row(row_left[reversed_row])
+        score_right[row] = score_left[reversed_row]
+    return row_left, score_left, row_right, score_right
+
+
+ROW_LEFT, SCORE_LEFT, ROW_RIGHT, SCORE_RIGHT = _build_row_tables()
+
+
+def transpose(bits):
+    """
+    Returns the packed board with its rows and columns swapped
+    """
+    a1 = bits & 0xF0F00F0FF0F00F0F
+    a2 = bits & 0x0000F0F00000F0F0
+    a3 = bits & 0x0F0F00000F0F0000
+    bits = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = bits & 0xFF00FF0000FF00FF
+    b2 = bits & 0x00FF00FF00000000
+    b3 = bits & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def _move_rows(bits, row_table, score_table):
+    row0, row1, row2, row3 = bits & ROW_MASK, (bits >> 16) & ROW_MASK, (bits >> 32) & ROW_MASK, bits >> 48
+    return (row_table[row0] | (row_table[row1] << 16) | (row_table[row2] << 32) | (row_table[row3] << 48),
+            score_table[row0] + score_table[row1] + score_table[row2] + score_table[row3])
+
+
+def move(bits, action):
+    """
+    Returns the packed board after the agent's <action> and the score it adds
+    """
+    if action == Action.RIGHT:
+        return _move_rows(bits, ROW_RIGHT, SCORE_RIGHT)
+    if action == Action.LEFT:
+        return _move_rows(bits, ROW_LEFT, SCORE_LEFT)
+    if action == Action.UP:
+        moved, score = _move_rows(transpose(bits), ROW_LEFT, SCORE_LEFT)
+    elif action == Action.DOWN:
+        moved, score = _move_rows(transpose(bits), ROW_RIGHT, SCORE_RIGHT)
+    else:
+        raise Exception("illegal action.")
+    return transpose(moved), score
+
+
+def has_empty_tile(bits):
+    """
+    Returns whether the packed board has an empty tile, in a few operations
+    on all 16 tiles at once
+    """
+    return ((bits - ONES) & ~bits & HIGH_BITS) != 0
+
+
+def pack_board(board):
+    """
+    Returns the packed board of a 4x4 array of tile values
+    """
+    bits = 0
+    for index, value in enumerate(np.asarray(board).flatten()):
+        value = int(value)
+        exponent = value.bit_length() - 1
+        if value != 0 and (value != 1 << exponent or not 0 < exponent <= MAX_EXPONENT):
+            raise Exception("tile value %s isn't a power of two up to %d." % (value, 1 << MAX_EXPONENT))
+        bits |= max(exponent, 0) << 4 * index
+    return bits
+
+
+def unpack_board(bits):
+    """
+    Returns the 4x4 int32 array of tile values of the packed board
+    """
+    exponents = [(bits >> 4 * index) & 0xF for index in range(DEFAULT_BOARD_SIZE * DEFAULT_BOARD_SIZE)]
+    return np.array([1 << exponent if exponent else 0 for exponent in exponents],
+                    dtype=np.int32).reshape(DEFAULT_BOARD_SIZE, DEFAULT_BOARD_SIZE)
+
+
+class BitboardGameState(object):
+    """
+    A GameState of a 4x4 board, packed into an int (see the module docstring).
+    The legal moves of the agent are found once per state and kept for
+    generate_successor.
+    """
+
+    def __init__(self, rows=DEFAULT_BOARD_SIZE, columns=DEFAULT_BOARD_SIZE, board=None, score=0, done=False,
+                 bits=None):
+        super(BitboardGameState, self).__init__()
+        if rows != DEFAULT_BOARD_SIZE or columns != DEFAULT_BOARD_SIZE:
+            raise Exception("a bitboard holds only %dx%d boards." % (DEFAULT_BOARD_SIZE, DEFAULT_BOARD_SIZE))
+        if bits is None:
+            bits = 0 if board is None else pack_board(board)
+        self._bits = bits
+        self._score = score
+        self._done = done
+        self._agent_moves = None  # (action, packed board, score added) per legal action
+        self._board = None
+
+    @classmethod
+    def from_game_state(cls, game_state):
+        """
+        Returns the BitboardGameState of <game_state>, or <game_state> itself
+        if it already is one
+        """
+        if isinstance(game_state, cls):
+            return game_state
+        return cls(board=game_state.board, score=game_state.score, done=game_state.done)
+
+    @property
+    def done(self):
+        return self._done
+
+    @property
+    def score(self):
+        return self._score
+
+    @property
+    def bits(self):
+        return self._bits
+
+    @property
+    def max_tile(self):
+        exponent = max((self._bits >> 4 * index) & 0xF for index in range(DEFAULT_BOARD_SIZE * DEFAULT_BOARD_SIZE))
+        return 1 << exponent if exponent else 0
+
+    @property
+    def board(self):
+        if self._board is None:
+            self._board = unpack_board(self._bits)
+        return self._board
+
+    def get_legal_actions(self, agent_index):
+        if agent_index == 0:
+            return self.get_agent_legal_actions()
+        elif agent_index == 1:
+            return self.get_opponent_legal_actions()
+        else:
+            raise Exception("illegal agent index.")
+
+    def get_opponent_legal_actions(self):
+        bits = self._bits
+        return [OpponentAction(row=index // DEFAULT_BOARD_SIZE, column=index % DEFAULT_BOARD_SIZE, value=value)
+                for index in range(DEFAULT_BOARD_SIZE * DEFAULT_BOARD_SIZE) if not (bits >> 4 * index) & 0xF
+                for value in [2, 4]]
+
+    def get_agent_legal_actions(self):
+        return [action for action, _, _ in self._get_agent_moves()]
+
+    def _get_agent_moves(self):
+        if self._agent_moves is None:
+            self._agent_moves = []
+            for action in AGENT_ACTIONS:
+                moved, score = move(self._bits, action)
+                if moved != self._bits:
+                    self._agent_moves.append((action, moved, score))
+        return self._agent_moves
+
+    def _get_agent_move(self, action):
+        for legal_action, moved, score in self._get_agent_moves():
+            if legal_action is action:
+                return moved, score
+        raise Exception("illegal action.")
+
+    def get_empty_tiles(self):
+        return np.where(self.board == 0)
+
+    def apply_opponent_action(self, action):
+        # The actions of RandomOpponentAgent hold NumPy integers, which would turn the board into a fixed width one
+        row, column, value = int(action.row), int(action.column), int(action.value)
+        shift = 4 * (row * DEFAULT_BOARD_SIZE + column)
+        if (self._bits >> shift) & 0xF:
+            raise Exception("illegal opponent action (%s,%s) isn't empty." % (row, column))
+        if value <= 0:
+            raise Exception("The action value must be positive integer.")
+        exponent = value.bit_length() - 1
+        if value != 1 << exponent or exponent > MAX_EXPONENT:
+            raise Exception("tile value %s isn't a power of two up to %d." % (value, 1 << MAX_EXPONENT))
+        self._set_bits(self._bits | exponent << shift)
+        # A tile can always slide into an empty tile, so only full boards may have no legal actions
+        if not has_empty_tile(self._bits) and not self._get_agent_moves():
+            self._done = True
+
+    def apply_action(self, action):
+        moved, score = self._get_agent_move(action)
+        self._set_bits(moved)
+        self._score += score
+
+    def generate_successor(self, agent_index=0, action=Action.STOP):
+        if agent_index == 0:
+            moved, score = self._get_agent_move(action)
+            return BitboardGameState(score=self._score + score, done=self._done, bits=moved)
+        elif agent_index == 1:
+            successor = BitboardGameState(score=self._score, done=self._done, bits=self._bits)
+            successor.apply_opponent_action(action)
+            return successor
+        else:
+            raise Exception("illegal agent index.")
+
+    def _set_bits(self, bits):
+        self._bits = bits
+        self._agent_moves = None
+        self._board = None
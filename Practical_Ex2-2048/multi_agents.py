@@ -1,13 +1,23 @@
 import math
+import time
 
 import numpy as np
 import abc
 import util
 from game import Agent, Action
+from bitboard_state import BitboardGameState
 from game_state import GameState
+from transposition_table import TranspositionTable, DEFAULT_TABLE_SIZE, EXACT, LOWER_BOUND, UPPER_BOUND, state_key
 
 MAX = 0
 MIN = 1
+MAX_ITERATIVE_DEPTH = 32
+
+
+class SearchTimeout(Exception):
+    """
+    Stops the search of an iterative deepening agent when its time budget is spent
+    """
 
 
 class ReflexAgent(Agent):
@@ -93,9 +103,86 @@ class MultiAgentSearchAgent(Agent):
     is another abstract class.
     """
 
-    def __init__(self, evaluation_function='scoreEvaluationFunction', depth=2):
+    uses_transposition_table = True  # whether the search of the agent reads and writes self.transposition_table
+
+    def __init__(self, evaluation_function='scoreEvaluationFunction', depth=2,
+                 transposition_table_size=DEFAULT_TABLE_SIZE, persist_transposition_table=False, time_budget=None):
         self.evaluation_function = util.lookup(evaluation_function, globals())
         self.depth = depth
+        self.transposition_table = None
+        if transposition_table_size > 0 and self.uses_transposition_table:
+            self.transposition_table = TranspositionTable(transposition_table_size)
+        self.persist_transposition_table = persist_transposition_table
+        self.time_budget = time_budget
+        self.completed_depths = []  # the depth of the last completed iteration, per move searched with time_budget
+        self.cut_off = False  # whether the search stopped a line at the depth limit rather than at the end of the game
+        self._deadline = None
+        self._best_actions = None  # (packed board, score) -> the best action found there, while deepening
+
+    def start_search(self):
+        """
+        Prepares the transposition table for the search of a new move: its
+        entries are kept for it if persist_transposition_table, else dropped
+        """
+        if self.transposition_table is not None:
+            if not self.persist_transposition_table:
+                self.transposition_table.clear()
+            self.transposition_table.new_search()
+
+    def iterative_deepening(self, game_state, search):
+        """
+        Returns the action search(game_state) chooses with self.depth set to
+        1, 2, ... until time_budget seconds are spent, from the deepest search
+        that completed. The search of depth 1 always completes, and a search
+        that isn't cut off by its depth saw every game to its end, so deeper
+        ones would choose the same. Every search tries the best action the
+        previous ones found in each state first.
+        """
+        start_time = time.perf_counter()
+        fixed_depth = self.depth
+        best_action, completed_depth = None, 0
+        self._best_actions = {}
+        try:
+            for depth in range(1, MAX_ITERATIVE_DEPTH + 1):
+                self.depth = depth
+                self.cut_off = False
+                try:
+                    best_action = search(game_state)
+                except SearchTimeout:
+                    break
+                completed_depth = depth
+                if not self.cut_off:
+                    break
+                self._deadline = start_time + self.time_budget
+                if time.perf_counter() >= self._deadline:
+                    break
+        finally:
+            self.depth = fixed_depth
+            self._deadline = None
+            self._best_actions = None
+        self.completed_depths.append(completed_depth)
+        return best_action
+
+    def check_time(self):
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+
+    def ordered_actions(self, state, agent_turn):
+        """
+        Returns the legal actions of <agent_turn> in <state>, while deepening
+        with the best action of the previous searches first
+        """
+        actions = state.get_legal_actions(agent_turn)
+        if agent_turn == MAX and self._best_actions:
+            best_action = self._best_actions.get((state.bits, state.score))
+            if best_action is not None:
+                actions.remove(best_action)
+                actions.insert(0, best_action)
+        return actions
+
+    def record_best_action(self, state, action):
+        if self._best_actions is not None:
+            self._best_actions[(state.bits, state.score)] = action
 
     @abc.abstractmethod
     def get_action(self, game_state):
@@ -104,13 +191,17 @@ class MultiAgentSearchAgent(Agent):
 
 class MinmaxAgent(MultiAgentSearchAgent):
 
+    uses_transposition_table = False
+
     def minimax_recursion(self, curr_depth, agent_turn, curr_state: GameState):
+        self.check_time()
         if curr_depth == 0 or curr_state.done:  # reached a leaf  or  has no legal actions
+            self.cut_off = self.cut_off or not curr_state.done
             return self.evaluation_function(curr_state)
 
         children_scores = []
         actions_list = []
-        for legal_action in curr_state.get_legal_actions(agent_turn):
+        for legal_action in self.ordered_actions(curr_state, agent_turn):
             child_state = curr_state.generate_successor(agent_index=agent_turn, action=legal_action)
             if agent_turn == MAX:
                 children_scores.append(self.minimax_recursion(curr_depth, MIN, child_state))
@@ -119,6 +210,8 @@ class MinmaxAgent(MultiAgentSearchAgent):
             actions_list.append(legal_action)
 
         if agent_turn == MAX:
+            if children_scores:
+                self.record_best_action(curr_state, actions_list[children_scores.index(max(children_scores))])
             if curr_depth == self.depth:  # root  ->  return action and not score
                 max_score = max(children_scores)
                 max_score_index = children_scores.index(max_score)
@@ -147,6 +240,9 @@ class MinmaxAgent(MultiAgentSearchAgent):
             Returns the successor game state after an agent takes an action
         """
         """*** YOUR CODE HERE ***"""
+        game_state = BitboardGameState.from_game_state(game_state)
+        if self.time_budget is not None:
+            return self.iterative_deepening(game_state, lambda state: self.minimax_recursion(self.depth, MAX, state))
         return self.minimax_recursion(self.depth, MAX, game_state)
 
 
@@ -156,16 +252,34 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
     """
 
     def alpha_beta_recursion(self, curr_depth, agent_turn, curr_state: GameState, alpha, beta):
+        self.check_time()
         if curr_depth == 0 or curr_state.done:  # reached a leaf  or  has no legal actions
+            self.cut_off = self.cut_off or not curr_state.done
             return self.evaluation_function(curr_state)
 
+        key = None
+        if self.transposition_table is not None and not (agent_turn == MAX and curr_depth == self.depth):
+            key = state_key(curr_state, curr_depth, agent_turn)
+            entry = self.transposition_table.lookup(key)
+            if entry is not None:
+                flag, value, cut_off = entry
+                if (flag == EXACT or (flag == LOWER_BOUND and value >= beta) or
+                        (flag == UPPER_BOUND and value <= alpha)):
+                    self.cut_off = self.cut_off or cut_off
+                    return value
+        original_alpha, original_beta = alpha, beta
+        outer_cut_off, self.cut_off = self.cut_off, False  # the root starts with none, so it needn't restore it
+
         if agent_turn == MAX:
             actions_list = []
             children_scores = []
             max_score = 0
-            for legal_action in curr_state.get_legal_actions(agent_turn):
+            best_action, best_score = None, -math.inf
+            for legal_action in self.ordered_actions(curr_state, agent_turn):
                 child_state = curr_state.generate_successor(agent_index=agent_turn, action=legal_action)
                 curr_score = self.alpha_beta_recursion(curr_depth, MIN, child_state, alpha, beta)
+                if curr_score > best_score:
+                    best_action, best_score = legal_action, curr_score
                 max_score = max(max_score, curr_score)
                 alpha = max(alpha, curr_score)
                 if beta <= alpha:
@@ -173,10 +287,13 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
                 actions_list.append(legal_action)
                 children_scores.append(curr_score)
 
+            if best_action is not None:
+                self.record_best_action(curr_state, best_action)
             if curr_depth == self.depth:  # root  ->  return action and not score
                 max_score_index = children_scores.index(max_score)
                 return actions_list[max_score_index]  # return the best action to do now
 
+            self._store_bounded(key, max_score, original_alpha, original_beta, outer_cut_off)
             return max_score  # not root  ->  return max score
 
         else:  # MIN
@@ -189,13 +306,35 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
                 if beta <= alpha:
                     break
 
+            self._store_bounded(key, min_score, original_alpha, original_beta, outer_cut_off)
             return min_score
 
+    def _store_bounded(self, key, score, alpha, beta, outer_cut_off):
+        """
+        Stores the score of a node searched with the (alpha, beta) window: out
+        of the window it is only a bound on the node's value. Then adds the
+        cut_off of the node's search to <outer_cut_off>, that of the search
+        before it.
+        """
+        if key is not None:
+            if score <= alpha:
+                self.transposition_table.store(key, score, UPPER_BOUND, self.cut_off)
+            elif score >= beta:
+                self.transposition_table.store(key, score, LOWER_BOUND, self.cut_off)
+            else:
+                self.transposition_table.store(key, score, EXACT, self.cut_off)
+        self.cut_off = self.cut_off or outer_cut_off
+
     def get_action(self, game_state):
         """
         Returns the minimax action using self.depth and self.evaluationFunction
         """
         """*** YOUR CODE HERE ***"""
+        game_state = BitboardGameState.from_game_state(game_state)
+        self.start_search()
+        if self.time_budget is not None:
+            return self.iterative_deepening(
+                game_state, lambda state: self.alpha_beta_recursion(self.depth, MAX, state, -math.inf, math.inf))
         return self.alpha_beta_recursion(self.depth, MAX, game_state, -math.inf, math.inf)
 
 
@@ -205,12 +344,24 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
     """
 
     def expectimax_recursion(self, curr_depth, agent_turn, curr_state: GameState):
+        self.check_time()
         if curr_depth == 0 or curr_state.done:  # reached a leaf  or  has no legal actions
+            self.cut_off = self.cut_off or not curr_state.done
             return self.evaluation_function(curr_state)
 
+        key = None
+        if self.transposition_table is not None and not (agent_turn == MAX and curr_depth == self.depth):
+            key = state_key(curr_state, curr_depth, agent_turn)
+            entry = self.transposition_table.lookup(key)
+            if entry is not None:
+                _, value, cut_off = entry
+                self.cut_off = self.cut_off or cut_off
+                return value
+        outer_cut_off, self.cut_off = self.cut_off, False  # the root starts with none, so it needn't restore it
+
         children_scores = []
         actions_list = []
-        for legal_action in curr_state.get_legal_actions(agent_turn):
+        for legal_action in self.ordered_actions(curr_state, agent_turn):
             child_state = curr_state.generate_successor(agent_index=agent_turn, action=legal_action)
             if agent_turn == MAX:
                 children_scores.append(self.expectimax_recursion(curr_depth, MIN, child_state))
@@ -219,15 +370,22 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
             actions_list.append(legal_action)
 
         if agent_turn == MAX:
+            if children_scores:
+                self.record_best_action(curr_state, actions_list[children_scores.index(max(children_scores))])
             if curr_depth == self.depth:  # root  ->  return action and not score
                 max_score = max(children_scores)
                 max_score_index = children_scores.index(max_score)
                 return actions_list[max_score_index]  # return the best action to do now
 
-            return max(children_scores, default=0)  # not root  ->  return max score
+            score = max(children_scores, default=0)  # not root  ->  return max score
 
         else:  # MIN
-            return np.mean(children_scores)  # return average score (expectation with uniform probability)
+            score = np.mean(children_scores)  # return average score (expectation with uniform probability)
+
+        if key is not None:
+            self.transposition_table.store(key, score, cut_off=self.cut_off)
+        self.cut_off = self.cut_off or outer_cut_off
+        return score
 
     def get_action(self, game_state):
         """
@@ -237,6 +395,10 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         legal moves.
         """
         """*** YOUR CODE HERE ***"""
+        game_state = BitboardGameState.from_game_state(game_state)
+        self.start_search()
+        if self.time_budget is not None:
+            return self.iterative_deepening(game_state, lambda state: self.expectimax_recursion(self.depth, MAX, state))
         return self.expectimax_recursion(self.depth, MAX, game_state)
 
 
@@ -0,0 +1,80 @@
+"""
+A bounded transposition table for the adversarial search agents of
+multi_agents.py, so a search evaluates a state it reaches through different
+move orders or chance outcomes only once.
+
+An entry is keyed by the packed board (bitboard_state.py), the score, the
+remaining depth and the agent to move, and goes in a slot picked by the
+hash of its key. When two keys need the same slot, the entry searched to
+the greater depth stays, because it stands for the most work. Entries left
+from the searches of earlier moves can always be replaced. An entry also
+tells whether the search below it stopped anywhere at the depth limit rather
+than at the end of the game, so a search reusing it knows whether it was cut
+off.
+"""
+
+EXACT = 0
+LOWER_BOUND = 1  # the value is at least the stored one (a cutoff of a max node)
+UPPER_BOUND = 2  # the value is at most the stored one (a cutoff of a min node)
+
+DEFAULT_TABLE_SIZE = 2 ** 18
+
+
+def state_key(state, depth, agent_index):
+    """
+    Returns the transposition table key of the BitboardGameState <state> with
+    <depth> plies left and <agent_index> to move
+    """
+    return state.bits, state.score, depth, agent_index
+
+
+class TranspositionTable(object):
+    def __init__(self, size=DEFAULT_TABLE_SIZE):
+        super(TranspositionTable, self).__init__()
+        self.size = size
+        self._slots = [None] * size  # (key, depth, flag, value, search, cut_off) or None
+        self._search = 0
+        self.lookups = 0
+        self.hits = 0
+        self.stores = 0
+        self.rejected = 0  # stores dropped for a deeper entry of the current search
+
+    def new_search(self):
+        """
+        Starts the search of a new move: entries of earlier searches stay
+        readable, but give way to any new entry
+        """
+        self._search += 1
+
+    def clear(self):
+        self._slots = [None] * self.size
+
+    def lookup(self, key):
+        """
+        Returns the (flag, value, cut_off) stored for <key>, or None
+        """
+        self.lookups += 1
+        entry = self._slots[hash(key) % self.size]
+        if entry is None or entry[0] != key:
+            return None
+        self.hits += 1
+        return entry[2], entry[3], entry[5]
+
+    def store(self, key, value, flag=EXACT, cut_off=True):
+        depth = key[2]
+        slot = hash(key) % self.size
+        entry = self._slots[slot]
+        if entry is not None and entry[4] == self._search and entry[1] > depth:
+            self.rejected += 1
+            return
+        self._slots[slot] = (key, depth, flag, value, self._search, cut_off)
+        self.stores += 1
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def __str__(self):
+        used = sum(entry is not None for entry in self._slots)
+        return "transposition table: %d lookups, %.1f%% hits, %d stores, %d rejected, %d of %d slots used" % (
+            self.lookups, 100 * self.hit_rate, self.stores, self.rejected, used, self.size)
@@ -1,5 +1,6 @@
 from util import Pair
 import copy
+import functools
 from proposition_layer import PropositionLayer
 from plan_graph_level import PlanGraphLevel
 from pgparser import PgParser
@@ -8,14 +9,20 @@ from action import Action
 try:
     from search import SearchProblem
     from search import a_star_search
+    from search import iterative_deepening_a_star_search
+    from search import memory_bounded_a_star_search
 
 except:
     try:
         from CPF.search import SearchProblem
         from CPF.search import a_star_search
+        from CPF.search import iterative_deepening_a_star_search
+        from CPF.search import memory_bounded_a_star_search
     except:
         from CPF.search_win_34 import SearchProblem
         from CPF.search_win_34 import a_star_search
+        from CPF.search_win_34 import iterative_deepening_a_star_search
+        from CPF.search_win_34 import memory_bounded_a_star_search
 
 
 class PlanningProblem:
@@ -214,13 +221,15 @@ if __name__ == '__main__':
     import sys
     import time
 
-    if len(sys.argv) != 1 and len(sys.argv) != 4:
-        print("Usage: PlanningProblem.py domainName problemName heuristicName(max, sum or zero)")
+    if len(sys.argv) not in (1, 4, 5, 6):
+        print("Usage: PlanningProblem.py domainName problemName heuristicName(max, sum or zero) "
+              "[searchName(astar, idastar or smastar) [maxNodes]]")
         exit()
     domain = 'dwrDomain.txt'
     problem = 'dwrProblem.txt'
     heuristic = null_heuristic
-    if len(sys.argv) == 4:
+    search = a_star_search
+    if len(sys.argv) >= 4:
         domain = str(sys.argv[1])
         problem = str(sys.argv[2])
         if str(sys.argv[3]) == 'max':
@@ -232,10 +241,22 @@ if __name__ == '__main__':
         else:
             print("Usage: planning_problem.py domain_name problem_name heuristic_name[max, sum, zero]")
             exit()
+    if len(sys.argv) >= 5:
+        if str(sys.argv[4]) == 'astar':
+            search = a_star_search
+        elif str(sys.argv[4]) == 'idastar':
+            search = iterative_deepening_a_star_search
+        elif str(sys.argv[4]) == 'smastar':
+            max_nodes = int(sys.argv[5]) if len(sys.argv) == 6 else 100000
+            search = functools.partial(memory_bounded_a_star_search, max_nodes=max_nodes)
+        else:
+            print("Usage: planning_problem.py domain_name problem_name heuristic_name[max, sum, zero] "
+                  "[search_name[astar, idastar, smastar] [max_nodes]]")
+            exit()
 
     prob = PlanningProblem(domain, problem)
     start = time.clock()
-    plan = a_star_search(prob, heuristic)
+    plan = search(prob, heuristic)
 
     elapsed = time.clock() - start
     if plan is not None:
@@ -1,6 +1,7 @@
 import sys
 import inspect
 import heapq
+import itertools
 import random
 
 
@@ -106,29 +107,29 @@ class PriorityQueue:
     Note that this PriorityQueue does not allow you to change the priority
     of an item.  However, you may insert the same item multiple times with
     different priorities.
+
+    Items of equal priority are popped newest first (a depth-first tie
+    break that suits A*), and items never need to be comparable.
     """
 
     def __init__(self):
         self.heap = []
-        self.init = False
+        self.count = itertools.count()
 
     def push(self, item, priority):
-        if not self.init:
-            self.init = True
-            try:
-                item < item
-            except:
-                item.__class__.__lt__ = lambda x, y: True
-        pair = (priority, item)
-        heapq.heappush(self.heap, pair)
+        entry = (priority, -next(self.count), item)
+        heapq.heappush(self.heap, entry)
 
     def pop(self):
-        (priority, item) = heapq.heappop(self.heap)
+        (priority, _, item) = heapq.heappop(self.heap)
         return item
 
     def isEmpty(self):
         return len(self.heap) == 0
 
+    def __len__(self):
+        return len(self.heap)
+
 
 class PriorityQueueWithFunction(PriorityQueue):
     """